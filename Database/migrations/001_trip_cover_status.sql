@@ -0,0 +1,5 @@
+-- Cover images are generated in the background (Lambda/generate_cover.py).
+-- NULL: never requested, pending: queued, ready: image in the cover bucket,
+-- missing: Google Places had no photo for the city.
+ALTER TABLE trips
+  ADD COLUMN cover_status VARCHAR(16) NULL DEFAULT NULL;
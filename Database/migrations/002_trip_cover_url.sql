@@ -0,0 +1,8 @@
+-- Cover index: the trip row records where its cover lives, so the trip list
+-- and the cover worker never need an S3 HEAD to find out.
+ALTER TABLE trips
+  ADD COLUMN cover_url VARCHAR(512) NULL DEFAULT NULL;
+
+UPDATE trips
+   SET cover_url = CONCAT('https://trip-planner-cover-storage.s3.amazonaws.com/', id, '.jpg')
+ WHERE cover_status = 'ready' AND cover_url IS NULL;
@@ -0,0 +1,15 @@
+-- Cached routes are keyed by a fingerprint of (start location, place list),
+-- so edits to a day invalidate only that day's route.
+ALTER TABLE daily_routes
+  ADD COLUMN fingerprint CHAR(64) NULL DEFAULT NULL;
+
+-- Cross-trip route cache: any trip whose day has the same fingerprint
+-- (e.g. a cloned trip) reuses the polyline without calling Directions.
+CREATE TABLE IF NOT EXISTS route_cache (
+  fingerprint  CHAR(64)     NOT NULL PRIMARY KEY,
+  origin       VARCHAR(255) NOT NULL,
+  destination  VARCHAR(255) NOT NULL,
+  polyline     MEDIUMTEXT   NOT NULL,
+  waypoints    TEXT         NOT NULL,
+  created_at   TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,10 @@
+-- Geocoded coordinates for locations, resolved once by Lambda/geocode_locations.py
+-- (bulk backfill) or on demand by routing. geocoded_at without lat/lng marks an
+-- address the Geocoding API could not resolve.
+ALTER TABLE locations
+  ADD COLUMN lat         DECIMAL(9, 6) NULL DEFAULT NULL,
+  ADD COLUMN lng         DECIMAL(9, 6) NULL DEFAULT NULL,
+  ADD COLUMN place_id    VARCHAR(255)  NULL DEFAULT NULL,
+  ADD COLUMN geocoded_at DATETIME      NULL DEFAULT NULL;
+
+CREATE INDEX idx_locations_geocoded_at ON locations (geocoded_at);
@@ -0,0 +1,6 @@
+-- The flight job looks up prior alerts only for the (user_id, ticket_number)
+-- pairs it is checking, and Lambda/prune_flight_alerts.py deletes alerts for
+-- flights that have departed.
+CREATE INDEX idx_flight_alerts_user_ticket ON flight_alerts (user_id, ticket_number);
+CREATE INDEX idx_flight_alerts_depart_time ON flight_alerts (depart_time);
+CREATE INDEX idx_flight_alerts_alerted_at  ON flight_alerts (alerted_at);
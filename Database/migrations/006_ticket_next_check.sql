@@ -0,0 +1,7 @@
+-- Adaptive flight polling: Lambda/write_abnormal_data_flight.py only checks
+-- tickets whose next_check_at has passed (NULL = never checked) and pushes it
+-- forward hourly, then every few minutes close to departure.
+ALTER TABLE tickets
+  ADD COLUMN next_check_at DATETIME NULL DEFAULT NULL;
+
+CREATE INDEX idx_tickets_departure_next_check ON tickets (departure_datetime, next_check_at);
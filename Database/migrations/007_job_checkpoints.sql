@@ -0,0 +1,15 @@
+-- Progress of resumable batch jobs. Lambda/write_weather_report.py records
+-- the last trip id it has enqueued per run (run_key = '<date>:<shard>/<shards>')
+-- and marks the run completed, so reruns resume or skip instead of resending.
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+  job        VARCHAR(64)  NOT NULL,
+  run_key    VARCHAR(64)  NOT NULL,
+  last_id    VARCHAR(64)  NOT NULL DEFAULT '',
+  completed  BOOLEAN      NOT NULL DEFAULT FALSE,
+  updated_at TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (job, run_key)
+);
+
+-- The weather job pages through one day's trips by id: a range on start_date
+-- plus the keyset on id
+CREATE INDEX idx_trips_start_date_id ON trips (start_date, id);
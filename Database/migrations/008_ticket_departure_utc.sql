@@ -0,0 +1,9 @@
+-- tickets.departure_datetime is the departure city's local time.
+-- Lambda/write_abnormal_data_flight.py schedules polls against UTC, so the UTC
+-- departure is stored alongside it. It comes from the ticket's UTC offset when
+-- it is parsed, or from the departure airport's timezone on the first flight
+-- status lookup. It stays NULL until one of those is known.
+ALTER TABLE tickets
+  ADD COLUMN departure_utc DATETIME NULL DEFAULT NULL;
+
+CREATE INDEX idx_tickets_departure_utc_next_check ON tickets (departure_utc, next_check_at);
@@ -0,0 +1,5 @@
+-- When a cover was last queued. Lambda/getTripDetails.py re-queues trips left
+-- 'pending' longer than COVER_RETRY_MINUTES, e.g. when the job exhausted its
+-- SQS retries and went to the dead-letter queue.
+ALTER TABLE trips
+  ADD COLUMN cover_requested_at DATETIME NULL DEFAULT NULL;
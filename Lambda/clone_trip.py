@@ -1,7 +1,7 @@
 import json
 import logging
+import db
 import os
-import pymysql
 from datetime import datetime
 from uuid import uuid4
 
@@ -9,30 +9,8 @@ from uuid import uuid4
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Database connection variables from environment
-DB_HOST = os.environ.get('DB_HOST')
-DB_NAME = os.environ.get('DB_NAME')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-
-# Initialize database connection
-def get_db_connection():
-    try:
-        if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD]):
-            raise ValueError("Missing required database environment variables")
-            
-        conn = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5,
-            cursorclass=pymysql.cursors.DictCursor  # Return results as dictionaries
-        )
-        return conn
-    except Exception as e:
-        logger.error("Database connection error: %s", str(e))
-        raise
+# Upper bound on start dates accepted by a single bulk clone request
+MAX_BULK_CLONES = int(os.environ.get('MAX_BULK_CLONES', 50))
 
 def lambda_handler(event, context):
     """Lambda function to clone a trip from an existing trip."""
@@ -60,15 +38,26 @@ def lambda_handler(event, context):
             logger.error('Authentication failed: No user email provided')
             return format_response(401, {'error': 'User email not provided'})
         
-        # Extract new trip data from request body
+        # Extract new trip data from request body; start_dates clones into many dates at once
         new_start_date = request_body.get('start_date')
+        start_dates = request_body.get('start_dates')
+        is_bulk = start_dates is not None
         
-        if not new_start_date:
+        if is_bulk:
+            if not isinstance(start_dates, list) or not start_dates or not all(start_dates):
+                logger.error('Invalid start_dates for bulk clone')
+                return format_response(400, {'error': 'start_dates must be a non-empty list of dates'})
+            if len(start_dates) > MAX_BULK_CLONES:
+                logger.error(f'Bulk clone of {len(start_dates)} dates exceeds limit {MAX_BULK_CLONES}')
+                return format_response(400, {'error': f'At most {MAX_BULK_CLONES} start dates can be cloned at once'})
+        elif not new_start_date:
             logger.error('New start date not provided')
             return format_response(400, {'error': 'New start date is required'})
+        else:
+            start_dates = [new_start_date]
         
         # Connect to database
-        conn = get_db_connection()
+        conn = db.get_dict_connection()
         
         try:
             with conn.cursor() as cursor:
@@ -91,110 +80,31 @@ def lambda_handler(event, context):
                     logger.error(f'Trip {original_trip_id} not found or user does not have access')
                     return format_response(403, {'error': 'Trip not found or you do not have permission to access it'})
                 
-                # Generate new trip ID
-                new_trip_id = str(uuid4())
-                
-                # Create the new trip record with the new start date
-                # Note: Make sure we match the exact columns in the trips table
-                logger.info(f'Creating new trip {new_trip_id} cloned from {original_trip_id}')
-                new_trip_sql = """
-                INSERT INTO trips (
-                    id, user_id, start_city, end_city, 
-                    duration, status, start_date, created_at
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                cursor.execute(new_trip_sql, (
-                    new_trip_id,
-                    original_trip['user_id'],
-                    original_trip['start_city'],
-                    original_trip['end_city'],
-                    original_trip['duration'],
-                    'Planning',  # Always set status to "Planning" for new cloned trips
-                    new_start_date,
-                    datetime.now().isoformat()
-                ))
-                
-                # Get all everyday records for the original trip
-                logger.info(f'Fetching everyday records for trip {original_trip_id}')
-                everyday_sql = """
-                SELECT * FROM everyday WHERE trip_id = %s
-                """
-                
-                cursor.execute(everyday_sql, (original_trip_id,))
-                everyday_records = cursor.fetchall()
-                
-                # Create mapping for original to new everyday IDs
-                everyday_id_map = {}
-                
-                # Clone all everyday records
-                for day in everyday_records:
-                    original_day_id = day['id']
-                    new_day_id = str(uuid4())
-                    everyday_id_map[original_day_id] = new_day_id
-                    
-                    logger.info(f'Cloning everyday record {original_day_id} to {new_day_id}')
-                    new_day_sql = """
-                    INSERT INTO everyday (
-                        id, trip_id, current_city, day_number, start_location
-                    )
-                    VALUES (%s, %s, %s, %s, %s)
-                    """
-                    
-                    cursor.execute(new_day_sql, (
-                        new_day_id,
-                        new_trip_id,
-                        day['current_city'],
-                        day['day_number'],
-                        day['start_location']
-                    ))
-                
-                # For each everyday record, clone its everyday_locations
-                for original_day_id, new_day_id in everyday_id_map.items():
-                    logger.info(f'Cloning everyday_locations for day {original_day_id}')
-                    
-                    # Get all everyday_locations for this day
-                    locations_sql = """
-                    SELECT el.*, l.name, l.address
-                    FROM everyday_locations el
-                    JOIN locations l ON el.location_id = l.id
-                    WHERE el.everyday_id = %s
-                    """
-                    
-                    cursor.execute(locations_sql, (original_day_id,))
-                    location_records = cursor.fetchall()
-                    
-                    # Clone all location mappings
-                    for location in location_records:
-                        # We'll use the same location record, just create a new mapping
-                        new_mapping_id = str(uuid4())
-                        
-                        logger.info(f'Cloning mapping for location {location["location_id"]} to day {new_day_id}')
-                        new_mapping_sql = """
-                        INSERT INTO everyday_locations (
-                            id, everyday_id, location_id
-                        )
-                        VALUES (%s, %s, %s)
-                        """
-                        
-                        cursor.execute(new_mapping_sql, (
-                            new_mapping_id,
-                            new_day_id,
-                            location['location_id']
-                        ))
+                # Copy the trip, its days and their activities with set-based statements
+                new_trip_ids = clone_trip_records(cursor, original_trip, start_dates)
                 
                 # Commit the transaction
                 conn.commit()
-                logger.info(f'Successfully cloned trip {original_trip_id} to {new_trip_id}')
+                logger.info(f'Successfully cloned trip {original_trip_id} to {new_trip_ids}')
                 
                 # For UI purposes, return the display title (not stored in DB)
                 display_title = f"Trip from {original_trip['start_city']} to {original_trip['end_city']}"
                 
+                if is_bulk:
+                    return format_response(200, {
+                        'message': f'Trip cloned to {len(new_trip_ids)} start dates successfully',
+                        'original_trip_id': original_trip_id,
+                        'new_trips': [
+                            {'new_trip_id': trip_id, 'start_date': start_date}
+                            for trip_id, start_date in zip(new_trip_ids, start_dates)
+                        ],
+                        'displayTitle': display_title
+                    })
+                
                 return format_response(200, {
                     'message': 'Trip cloned successfully',
                     'original_trip_id': original_trip_id,
-                    'new_trip_id': new_trip_id,
+                    'new_trip_id': new_trip_ids[0],
                     'displayTitle': display_title
                 })
                 
@@ -204,7 +114,7 @@ def lambda_handler(event, context):
             logger.error(f"Database error: {str(db_error)}")
             raise
         finally:
-            conn.close()
+            db.release(conn)
             
     except Exception as e:
         logger.error(f'Error cloning trip: {str(e)}', exc_info=True)
@@ -213,6 +123,84 @@ def lambda_handler(event, context):
             'details': str(e)
         })
 
+def id_map_table(rows):
+    """Build a derived table of literal (old_id, new_id, trip_id) rows for INSERT ... SELECT joins."""
+    first = "SELECT %s AS old_id, %s AS new_id, %s AS trip_id"
+    sql = " UNION ALL ".join([first] + ["SELECT %s, %s, %s"] * (len(rows) - 1))
+    params = [value for row in rows for value in row]
+    return sql, params
+
+def clone_trip_records(cursor, original_trip, start_dates):
+    """Clone a trip once per start date and return the new trip IDs.
+    
+    Uses a fixed number of statements regardless of trip length: one bulk
+    trip insert, one lookup of the original day IDs, and one INSERT ... SELECT
+    each for everyday and everyday_locations (per packet-sized chunk of the
+    day ID map). Locations are shared, only the mappings are copied.
+    """
+    original_trip_id = original_trip['id']
+    new_trip_ids = [str(uuid4()) for _ in start_dates]
+    
+    # Create the new trip records with the new start dates
+    # Note: Make sure we match the exact columns in the trips table
+    logger.info(f'Creating trips {new_trip_ids} cloned from {original_trip_id}')
+    new_trip_sql = """
+    INSERT INTO trips (
+        id, user_id, start_city, end_city, 
+        duration, status, start_date, created_at
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    
+    created_at = datetime.now().isoformat()
+    cursor.executemany(new_trip_sql, [
+        (
+            new_trip_id,
+            original_trip['user_id'],
+            original_trip['start_city'],
+            original_trip['end_city'],
+            original_trip['duration'],
+            'Planning',  # Always set status to "Planning" for new cloned trips
+            start_date,
+            created_at
+        )
+        for new_trip_id, start_date in zip(new_trip_ids, start_dates)
+    ])
+    
+    # Precompute new everyday IDs for every (original day, new trip) pair
+    cursor.execute("SELECT id FROM everyday WHERE trip_id = %s", (original_trip_id,))
+    original_day_ids = [row['id'] for row in cursor.fetchall()]
+    day_map = [
+        (original_day_id, str(uuid4()), new_trip_id)
+        for new_trip_id in new_trip_ids
+        for original_day_id in original_day_ids
+    ]
+    logger.info(f'Cloning {len(original_day_ids)} days into {len(new_trip_ids)} trip(s)')
+    
+    for batch in db.chunked(day_map):
+        map_sql, map_params = id_map_table(batch)
+        
+        cursor.execute(f"""
+        INSERT INTO everyday (
+            id, trip_id, current_city, day_number, start_location
+        )
+        SELECT m.new_id, m.trip_id, e.current_city, e.day_number, e.start_location
+        FROM everyday e
+        JOIN ({map_sql}) m ON m.old_id = e.id
+        """, map_params)
+        
+        # We'll use the same location records, just create new mappings
+        cursor.execute(f"""
+        INSERT INTO everyday_locations (
+            id, everyday_id, location_id
+        )
+        SELECT UUID(), m.new_id, el.location_id
+        FROM everyday_locations el
+        JOIN ({map_sql}) m ON m.old_id = el.everyday_id
+        """, map_params)
+    
+    return new_trip_ids
+
 def format_response(status_code, body):
     """Helper to format response in API Gateway format"""
     return {
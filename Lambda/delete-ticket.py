@@ -1,12 +1,5 @@
-import os
 import json
-import pymysql
-
-# DB config via environment variables
-DB_HOST     = os.environ["DB_HOST"]
-DB_USER     = os.environ["DB_USER"]
-DB_PASSWORD = os.environ["DB_PASSWORD"]
-DB_NAME     = os.environ["DB_NAME"]
+import db
 
 def lambda_handler(event, context):
     # 1) get ticket_id from the path
@@ -23,13 +16,7 @@ def lambda_handler(event, context):
         }
 
     # 2) connect to the database
-    conn = pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    conn = db.get_dict_connection()
 
     try:
         with conn.cursor() as cur:
@@ -77,4 +64,4 @@ def lambda_handler(event, context):
         }
 
     finally:
-        conn.close()
\ No newline at end of file
+        db.release(conn)
\ No newline at end of file
@@ -1,35 +1,14 @@
 import json
 import logging
-import os
-import pymysql
+import boto3
+import db
+import cover_index
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Database connection variables from environment
-DB_HOST = os.environ.get('DB_HOST')
-DB_NAME = os.environ.get('DB_NAME')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-
-# Initialize database connection
-def get_db_connection():
-    try:
-        if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD]):
-            raise ValueError("Missing required database environment variables")
-            
-        conn = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5
-        )
-        return conn
-    except Exception as e:
-        logger.error("Database connection error: %s", str(e))
-        raise
+s3 = boto3.client('s3')
 
 def lambda_handler(event, context):
     """Lambda function to delete a trip and its related records."""
@@ -54,7 +33,7 @@ def lambda_handler(event, context):
         logger.info(f'Attempting to delete trip {trip_id} for user {user_email}')
         
         # Get database connection
-        conn = get_db_connection()
+        conn = db.get_connection()
         
         try:
             with conn.cursor() as cursor:
@@ -97,6 +76,9 @@ def lambda_handler(event, context):
                 conn.commit()
                 logger.info(f'Successfully deleted trip {trip_id} and all related data')
                 
+                # Invalidate the cover index and remove the image
+                remove_cover(trip_id)
+                
                 return format_response(200, {
                     'success': True,
                     'message': 'Trip deleted successfully',
@@ -109,7 +91,7 @@ def lambda_handler(event, context):
             logger.error(f"Database error: {str(db_error)}")
             raise
         finally:
-            conn.close()
+            db.release(conn)
             
     except Exception as e:
         logger.error(f'Error deleting trip: {str(e)}', exc_info=True)
@@ -118,6 +100,15 @@ def lambda_handler(event, context):
             'details': str(e)
         })
 
+def remove_cover(trip_id):
+    """Drop a deleted trip's cover from the cover index and the cover bucket."""
+    cover_index.forget(trip_id)
+    try:
+        s3.delete_object(Bucket=cover_index.COVER_BUCKET, Key=cover_index.cover_key(trip_id))
+    except Exception as e:
+        # The trip is already gone; an orphaned image is harmless
+        logger.warning(f'Failed to delete cover for trip {trip_id}: {str(e)}')
+
 def format_response(status_code, body):
     """Helper to format response in API Gateway format"""
     return {
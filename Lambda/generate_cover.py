@@ -0,0 +1,89 @@
+import os
+import json
+import db
+import boto3
+import cover_index
+import requests
+from botocore.exceptions import ClientError
+
+# === CONFIG ===
+PLACES_API_KEY = os.environ["GOOGLE_PLACES_API_KEY"]
+COVER_BUCKET = cover_index.COVER_BUCKET
+
+s3 = boto3.client("s3")
+
+def check_s3_cover(trip_id):
+    try:
+        s3.head_object(Bucket=COVER_BUCKET, Key=cover_index.cover_key(trip_id))
+        return cover_index.cover_url_for(trip_id)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "404":
+            return None
+        raise
+
+def fetch_and_store_cover(start_city, trip_id):
+    print(f"[DEBUG] Fetching cover for {start_city} (Trip ID: {trip_id})")
+
+    search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+    res = requests.get(search_url, params={"query": start_city, "key": PLACES_API_KEY}, timeout=10)
+    data = res.json()
+    print("[DEBUG] Text search result:", data)
+
+    if "results" not in data or not data["results"]:
+        print("[WARN] No results found for", start_city)
+        return None
+
+    place = data["results"][0]
+    if "photos" not in place:
+        print("[WARN] No photo found for", start_city)
+        return None
+
+    photo_ref = place["photos"][0]["photo_reference"]
+    photo_url = "https://maps.googleapis.com/maps/api/place/photo"
+    photo_params = {"photoreference": photo_ref, "key": PLACES_API_KEY, "maxwidth": 600}
+    image_response = requests.get(photo_url, params=photo_params, stream=True, timeout=10)
+    print("[DEBUG] Image fetch status:", image_response.status_code)
+
+    if image_response.status_code != 200:
+        return None
+
+    try:
+        s3.upload_fileobj(
+            image_response.raw,
+            COVER_BUCKET,
+            cover_index.cover_key(trip_id),
+            ExtraArgs={
+                "ContentType": "image/jpeg"
+            }
+        )
+        print(f"[DEBUG] Uploaded image to S3: {cover_index.cover_key(trip_id)}")
+        return cover_index.cover_url_for(trip_id)
+    except ClientError as e:
+        print("[ERROR] S3 upload failed:", e)
+        return None
+
+# === Lambda Handler (SQS event source, queued by getTripDetails.py) ===
+def lambda_handler(event, context):
+    failures = []
+
+    for record in event.get("Records", []):
+        try:
+            job = json.loads(record["body"])
+            trip_id = job["trip_id"]
+
+            conn = db.get_dict_connection()
+
+            # Indexed covers need no S3 call; only trips created before the index get one HEAD
+            cover_url = cover_index.lookup(conn, trip_id) or check_s3_cover(trip_id)
+            if not cover_url:
+                cover_url = fetch_and_store_cover(job["start_city"], trip_id)
+
+            cover_index.record(conn, trip_id, "ready" if cover_url else "missing", cover_url)
+            print(f"[DEBUG] Cover for trip {trip_id}: {'ready' if cover_url else 'missing'}")
+        except Exception as e:
+            # Leave the trip pending; SQS redelivers just this message, and getTripDetails.py
+            # re-queues it if it ends up dead-lettered
+            print("[ERROR] Cover generation failed:", str(e))
+            failures.append({"itemIdentifier": record["messageId"]})
+
+    return {"batchItemFailures": failures}
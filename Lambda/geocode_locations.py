@@ -0,0 +1,55 @@
+import os
+import json
+import db
+import geocoding
+
+# === Config ===
+GEOCODE_BATCH_SIZE = int(os.environ.get("GEOCODE_BATCH_SIZE", 200))
+
+def query_ungeocoded_locations(conn, after_id, limit):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT id, name, address, lat, lng
+            FROM locations
+            WHERE geocoded_at IS NULL AND lat IS NULL AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (after_id, limit))
+        return cursor.fetchall()
+
+def mark_unresolved(conn, location_ids):
+    if not location_ids:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE locations SET geocoded_at = NOW() WHERE id IN ({db.in_placeholders(location_ids)})",
+            location_ids
+        )
+
+# === Lambda Handler (scheduled backfill) ===
+def lambda_handler(event, context):
+    print("[DEBUG] Received event:", json.dumps(event))
+    conn = db.get_dict_connection()
+
+    after_id = ""
+    resolved = unresolved = 0
+    while True:
+        # Stop early rather than let Lambda kill the run mid-batch
+        if context and context.get_remaining_time_in_millis() < 30000:
+            print("[WARN] Running out of time, stopping; the next run picks up the rest")
+            break
+
+        rows = query_ungeocoded_locations(conn, after_id, GEOCODE_BATCH_SIZE)
+        if not rows:
+            break
+        after_id = rows[-1]["id"]
+
+        geocoded, not_found = geocoding.ensure_coordinates(conn, rows)
+        resolved += geocoded
+        # Only addresses the API has no match for are marked; rows whose lookup
+        # failed (quota, timeouts) stay unmarked for the next run
+        mark_unresolved(conn, [r["id"] for r in not_found])
+        unresolved += len(not_found)
+
+    print(f"[DEBUG] Geocoded {resolved} location(s), {unresolved} unresolved")
+    return {"statusCode": 200, "body": json.dumps({"geocoded": resolved, "unresolved": unresolved})}
@@ -1,13 +1,6 @@
-import os
 import json
 import datetime
-import pymysql
-
-# DB config via env vars
-DB_HOST     = os.environ["DB_HOST"]
-DB_USER     = os.environ["DB_USER"]
-DB_PASSWORD = os.environ["DB_PASSWORD"]
-DB_NAME     = os.environ["DB_NAME"]
+import db
 
 def lambda_handler(event, context):
     # 1) get user_email
@@ -24,13 +17,7 @@ def lambda_handler(event, context):
         }
 
     # 2) open DB connection
-    conn = pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    conn = db.get_dict_connection()
 
     try:
         with conn.cursor() as cur:
@@ -67,7 +54,7 @@ def lambda_handler(event, context):
             tickets = cur.fetchall()
 
     finally:
-        conn.close()
+        db.release(conn)
 
     # 5) split & sort
     now = datetime.datetime.now()
@@ -1,79 +1,42 @@
 import os
 import json
-import pymysql
+import db
 import boto3
-import requests
+import cover_index
+import sqs_producer
 from datetime import date
-from botocore.exceptions import ClientError
 
 # === CONFIG ===
-DB_HOST = os.environ["DB_HOST"]
-DB_USER = os.environ["DB_USER"]
-DB_PASSWORD = os.environ["DB_PASSWORD"]
-DB_NAME = os.environ["DB_NAME"]
-PLACES_API_KEY = os.environ["GOOGLE_PLACES_API_KEY"]
-COVER_BUCKET = "trip-planner-cover-storage"
-
-s3 = boto3.client("s3")
-
-def get_db_connection():
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
-
-def check_s3_cover(trip_id):
-    try:
-        s3.head_object(Bucket=COVER_BUCKET, Key=f"{trip_id}.jpg")
-        return f"https://{COVER_BUCKET}.s3.amazonaws.com/{trip_id}.jpg"
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "404":
-            return None
-        raise
-
-def fetch_and_store_cover(start_city, trip_id):
-    print(f"[DEBUG] Fetching cover for {start_city} (Trip ID: {trip_id})")
-
-    search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    res = requests.get(search_url, params={"query": start_city, "key": PLACES_API_KEY})
-    data = res.json()
-    print("[DEBUG] Text search result:", data)
-
-    if "results" not in data or not data["results"]:
-        print("[WARN] No results found for", start_city)
-        return None
-
-    place = data["results"][0]
-    if "photos" not in place:
-        print("[WARN] No photo found for", start_city)
-        return None
-
-    photo_ref = place["photos"][0]["photo_reference"]
-    photo_url = "https://maps.googleapis.com/maps/api/place/photo"
-    photo_params = {"photoreference": photo_ref, "key": PLACES_API_KEY, "maxwidth": 600}
-    image_response = requests.get(photo_url, params=photo_params, stream=True)
-    print("[DEBUG] Image fetch status:", image_response.status_code)
-
-    if image_response.status_code != 200:
-        return None
-
-    try:
-        s3.upload_fileobj(
-            image_response.raw,
-            COVER_BUCKET,
-            f"{trip_id}.jpg",
-            ExtraArgs={
-                "ContentType": "image/jpeg"
-            }
-        )
-        print(f"[DEBUG] Uploaded image to S3: {trip_id}.jpg")
-        return f"https://{COVER_BUCKET}.s3.amazonaws.com/{trip_id}.jpg"
-    except ClientError as e:
-        print("[ERROR] S3 upload failed:", e)
-        return None
+COVER_QUEUE_URL = os.environ.get("COVER_QUEUE_URL")  # consumed by generate_cover.py
+# Re-queue covers still pending after this long; keep it above the queue's
+# visibility timeout times its maxReceiveCount
+COVER_RETRY_MINUTES = int(os.environ.get("COVER_RETRY_MINUTES", 30))
+
+sqs = boto3.client("sqs")
+
+def enqueue_cover_jobs(conn, trips):
+    """Queue cover generation for trips with no cover requested (or a stale request) and mark them pending."""
+    if not trips:
+        return
+    if not COVER_QUEUE_URL:
+        print("[WARN] COVER_QUEUE_URL not set, skipping cover generation for", len(trips), "trip(s)")
+        return
+
+    with sqs_producer.BufferedProducer(COVER_QUEUE_URL, sqs) as producer:
+        for t in trips:
+            producer.send({"trip_id": t["id"], "start_city": t["start_city"]}, key=t["id"])
+    queued = producer.sent
+    if producer.failed:
+        print("[WARN] Failed to queue cover jobs for", len(producer.failed), "trip(s)")
+
+    if queued:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE trips SET cover_status = 'pending', cover_requested_at = UTC_TIMESTAMP()
+                WHERE id IN ({db.in_placeholders(queued)})
+                  AND (cover_status IS NULL OR cover_status = 'pending')
+            """, queued)
+        print(f"[DEBUG] Queued cover generation for {len(queued)} trip(s)")
 
 def lambda_handler(event, context):
     try:
@@ -87,7 +50,7 @@ def lambda_handler(event, context):
         print(f"[DEBUG] Looking up user with email: {email}")
         
         # Get database connection
-        conn = get_db_connection()
+        conn = db.get_dict_connection()
         
         # First, get the user's UUID from the users table
         user_uuid = None
@@ -113,31 +76,42 @@ def lambda_handler(event, context):
         # Now query trips with the correct user UUID
         with conn.cursor() as cursor:
             cursor.execute("""
-                SELECT id, start_city, end_city, duration, status, start_date
+                SELECT id, start_city, end_city, duration, status, start_date, cover_status, cover_url,
+                       cover_status = 'pending'
+                         AND (cover_requested_at IS NULL
+                              OR cover_requested_at < UTC_TIMESTAMP() - INTERVAL %s MINUTE) AS cover_stale
                 FROM trips WHERE user_id = %s
-            """, (user_uuid,))
+            """, (COVER_RETRY_MINUTES, user_uuid))
             trips = cursor.fetchall()
             
         print(f"[DEBUG] Found {len(trips)} trips for user")
 
         results = []
+        to_generate = []
         for trip in trips:
             trip_id = trip["id"]
             start_city = trip["start_city"]
             trip["title"] = f"Trip to {start_city}"
 
-            cover_url = check_s3_cover(trip_id)
-            if not cover_url:
-                cover_url = fetch_and_store_cover(start_city, trip_id)
-
+            # Covers come from the cover index; without one the dashboard shows its placeholder
+            cover_stale = trip.pop("cover_stale")
+            cover_url = cover_index.resolve(trip)
             if cover_url:
                 trip["cover_url"] = cover_url
+            else:
+                trip.pop("cover_url", None)
+                # Pending requests that never finished (e.g. dead-lettered) are queued again
+                if trip["cover_status"] is None or cover_stale:
+                    to_generate.append(trip)
+                    trip["cover_status"] = "pending"
 
             if isinstance(trip.get("start_date"), date):
                 trip["start_date"] = trip["start_date"].isoformat()
 
             results.append(trip)
 
+        enqueue_cover_jobs(conn, to_generate)
+
         return {
             "statusCode": 200,
             "headers": {
@@ -1,38 +1,12 @@
 import json
 import logging
-import os
-import pymysql
+import db
 from datetime import date, datetime
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Database connection variables from environment
-DB_HOST = os.environ.get('DB_HOST')
-DB_NAME = os.environ.get('DB_NAME')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-
-# Initialize database connection
-def get_db_connection():
-    try:
-        if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD]):
-            raise ValueError("Missing required database environment variables")
-            
-        conn = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5,
-            cursorclass=pymysql.cursors.DictCursor  # Return results as dictionaries
-        )
-        return conn
-    except Exception as e:
-        logger.error("Database connection error: %s", str(e))
-        raise
-
 def lambda_handler(event, context):
     """Lambda function to get trip details from Aurora MySQL."""
     logger.info('Received event: %s', json.dumps(event))
@@ -57,7 +31,7 @@ def lambda_handler(event, context):
         logger.info(f'Fetching trip {trip_id} for user {user_email}')
         
         # Get database connection
-        conn = get_db_connection()
+        conn = db.get_dict_connection()
         
         try:
             with conn.cursor() as cursor:
@@ -91,7 +65,7 @@ def lambda_handler(event, context):
             logger.error(f"Database error: {str(db_error)}", exc_info=True)
             raise
         finally:
-            conn.close()
+            db.release(conn)
             
     except Exception as e:
         logger.error(f'Error getting trip details: {str(e)}', exc_info=True)
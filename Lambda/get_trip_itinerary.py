@@ -1,37 +1,11 @@
 import json
 import logging
-import os
-import pymysql
+import db
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Database connection variables from environment
-DB_HOST = os.environ.get('DB_HOST')
-DB_NAME = os.environ.get('DB_NAME')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-
-# Initialize database connection
-def get_db_connection():
-    try:
-        if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD]):
-            raise ValueError("Missing required database environment variables")
-            
-        conn = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5,
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        return conn
-    except Exception as e:
-        logger.error("Database connection error: %s", str(e))
-        raise
-
 def lambda_handler(event, context):
     """Lambda function to get trip itinerary details from Aurora MySQL."""
     logger.info('Received event: %s', json.dumps(event))
@@ -53,7 +27,7 @@ def lambda_handler(event, context):
             return format_response(401, {'error': 'User email not provided'})
         
         # Get database connection
-        conn = get_db_connection()
+        conn = db.get_dict_connection()
         
         try:
             with conn.cursor() as cursor:
@@ -74,7 +48,7 @@ def lambda_handler(event, context):
                 
                 # Modified SQL query to not include the non-existent l.description column
                 activities_sql = """
-                SELECT el.id, ed.day_number, l.name, l.address, ed.current_city
+                SELECT el.id, ed.day_number, l.name, l.address, l.lat, l.lng, ed.current_city
                 FROM everyday_locations el
                 JOIN everyday ed ON el.everyday_id = ed.id
                 JOIN locations l ON el.location_id = l.id
@@ -89,6 +63,10 @@ def lambda_handler(event, context):
                 for activity in activities:
                     # Add an empty description field or use address as a fallback
                     activity['description'] = activity.get('address', '') or ''
+                    # Stored coordinates let the map place markers without geocoding
+                    for key in ('lat', 'lng'):
+                        if activity[key] is not None:
+                            activity[key] = float(activity[key])
                 
                 # Return the activities
                 return format_response(200, {
@@ -99,7 +77,7 @@ def lambda_handler(event, context):
             logger.error(f"Database error: {str(db_error)}", exc_info=True)
             raise
         finally:
-            conn.close()
+            db.release(conn)
             
     except Exception as e:
         logger.error(f'Error getting trip itinerary: {str(e)}', exc_info=True)
@@ -1,16 +1,7 @@
 import json
-import os
-import pymysql
+import db
 import datetime
 
-# Database configuration
-db_config = {
-    'host': os.environ['DB_HOST'],
-    'user': os.environ['DB_USER'],
-    'password': os.environ['DB_PASSWORD'],
-    'database': os.environ['DB_NAME']
-}
-
 def lambda_handler(event, context):
     # Log the entire event for debugging
     print("RECEIVED EVENT:", json.dumps(event))
@@ -105,13 +96,7 @@ def lambda_handler(event, context):
         
         # Create connection to database
         print("Connecting to database...")
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            database=db_config['database'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = db.get_dict_connection()
         print("Database connection successful")
         
         try:
@@ -186,7 +171,7 @@ def lambda_handler(event, context):
             }
             
         finally:
-            connection.close()
+            db.release(connection)
             print("Database connection closed")
             
     except Exception as e:
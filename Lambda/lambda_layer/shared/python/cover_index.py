@@ -0,0 +1,64 @@
+import os
+
+from ttl_cache import TTLCache
+
+COVER_BUCKET = os.environ.get('COVER_BUCKET', 'trip-planner-cover-storage')
+COVER_CACHE_SIZE = int(os.environ.get('COVER_CACHE_SIZE', 2048))
+COVER_CACHE_TTL_SECONDS = int(os.environ.get('COVER_CACHE_TTL_SECONDS', 600))
+
+# trip_id -> cover URL for trips whose cover is known to exist
+_covers = TTLCache(maxsize=COVER_CACHE_SIZE, ttl=COVER_CACHE_TTL_SECONDS)
+
+
+def cover_key(trip_id):
+    return f"{trip_id}.jpg"
+
+
+def cover_url_for(trip_id):
+    return f"https://{COVER_BUCKET}.s3.amazonaws.com/{cover_key(trip_id)}"
+
+
+def resolve(trip):
+    """Cover URL for a trips row selected with cover_status and cover_url, or None."""
+    cover_url = _covers.get(trip['id'])
+    if cover_url:
+        return cover_url
+    if trip.get('cover_status') != 'ready':
+        return None
+    # Rows marked ready before cover_url existed use the deterministic key
+    cover_url = trip.get('cover_url') or cover_url_for(trip['id'])
+    _covers.set(trip['id'], cover_url)
+    return cover_url
+
+
+def lookup(conn, trip_id):
+    """Indexed cover URL for a trip (cache first, then the trips row), or None."""
+    cover_url = _covers.get(trip_id)
+    if cover_url:
+        return cover_url
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT id, cover_status, cover_url FROM trips WHERE id = %s", (trip_id,))
+        row = cursor.fetchone()
+    if not row:
+        return None
+    if not isinstance(row, dict):
+        row = dict(zip(('id', 'cover_status', 'cover_url'), row))
+    return resolve(row)
+
+
+def record(conn, trip_id, status, cover_url=None):
+    """Persist a cover result on the trip and refresh this container's cache."""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "UPDATE trips SET cover_status = %s, cover_url = %s WHERE id = %s",
+            (status, cover_url, trip_id)
+        )
+    if cover_url:
+        _covers.set(trip_id, cover_url)
+    else:
+        _covers.delete(trip_id)
+
+
+def forget(trip_id):
+    """Drop a trip from this container's cache (e.g. after the trip is deleted)."""
+    _covers.delete(trip_id)
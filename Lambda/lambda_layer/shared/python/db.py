@@ -0,0 +1,181 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+# Configure logging
+logger = logging.getLogger()
+
+# Database connection variables from environment
+DB_HOST = os.environ.get('DB_HOST')
+DB_NAME = os.environ.get('DB_NAME')
+DB_USER = os.environ.get('DB_USER')
+DB_PASSWORD = os.environ.get('DB_PASSWORD')
+
+# Recycle the warm connection after this many seconds, even if it is healthy
+DB_MAX_AGE_SECONDS = int(os.environ.get('DB_MAX_AGE_SECONDS', 900))
+# Only ping the server when the connection has been idle longer than this
+DB_PING_INTERVAL_SECONDS = int(os.environ.get('DB_PING_INTERVAL_SECONDS', 30))
+DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
+
+# Module-level state survives between warm invocations of the same container
+_conn = None
+_opened_at = 0.0
+_last_used_at = 0.0
+
+
+def _connect():
+    if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD]):
+        raise ValueError("Missing required database environment variables")
+
+    # autocommit keeps reads on a reused connection from pinning an old snapshot;
+    # multi-statement writes go through transaction() / conn.begin()
+    return pymysql.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+        autocommit=True
+    )
+
+
+def invalidate():
+    """Drop the cached connection so the next get_connection() opens a new one."""
+    global _conn
+    if _conn is not None:
+        try:
+            _conn.close()
+        except Exception:
+            pass
+    _conn = None
+
+
+def _is_alive(conn, now):
+    if not conn.open:
+        return False
+    if now - _last_used_at < DB_PING_INTERVAL_SECONDS:
+        return True
+    try:
+        conn.ping(reconnect=False)
+        return True
+    except Exception as e:
+        logger.warning("Stale database connection, reconnecting: %s", str(e))
+        return False
+
+
+def get_connection(cursorclass=pymysql.cursors.Cursor):
+    """Return the warm connection for this container, reconnecting if stale or too old."""
+    global _conn, _opened_at, _last_used_at
+    now = time.monotonic()
+
+    if _conn is not None and now - _opened_at > DB_MAX_AGE_SECONDS:
+        logger.info("Database connection reached max age, recycling")
+        invalidate()
+
+    if _conn is not None and not _is_alive(_conn, now):
+        invalidate()
+
+    if _conn is None:
+        try:
+            _conn = _connect()
+        except Exception as e:
+            logger.error("Database connection error: %s", str(e))
+            raise
+        _opened_at = now
+
+    _last_used_at = now
+    # Handlers disagree on tuple vs dict rows; cursor() picks this up by default
+    _conn.cursorclass = cursorclass
+    return _conn
+
+
+def get_dict_connection():
+    """Shortcut for handlers that read rows as dictionaries."""
+    return get_connection(pymysql.cursors.DictCursor)
+
+
+@contextmanager
+def transaction(conn=None, cursorclass=pymysql.cursors.Cursor):
+    """Run the block in a single transaction on the warm connection.
+
+    Pass conn to reuse a connection the caller already holds (and keep its
+    cursor class). Commits on normal exit and rolls back on error. If the
+    rollback itself fails the connection is discarded, since its state is
+    unknown.
+    """
+    conn = conn or get_connection(cursorclass)
+    conn.begin()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            invalidate()
+        raise
+
+
+def release(conn):
+    """Hand a connection back after a request.
+
+    The connection stays open for the next invocation; anything left
+    uncommitted is rolled back so it cannot leak into the next request.
+    """
+    if conn is None or not conn.open:
+        return
+    # Skip the round trip unless the server reports an open transaction
+    if not conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+        return
+    try:
+        conn.rollback()
+    except Exception:
+        invalidate()
+
+
+# Keep batched statements comfortably below Aurora's max_allowed_packet
+DB_MAX_STATEMENT_BYTES = int(os.environ.get('DB_MAX_STATEMENT_BYTES', 1024 * 1024))
+DB_MAX_BATCH_ROWS = int(os.environ.get('DB_MAX_BATCH_ROWS', 1000))
+
+
+def _estimate_row_bytes(row):
+    if isinstance(row, dict):
+        row = row.values()
+    elif not isinstance(row, (list, tuple)):
+        row = (row,)
+    # Quotes, commas and parentheses around each value
+    return sum(len(str(value)) + 4 for value in row) + 2
+
+
+def chunked(rows, max_bytes=None, max_rows=None):
+    """Split rows into batches whose rendered SQL stays under the packet budget."""
+    max_bytes = max_bytes or DB_MAX_STATEMENT_BYTES
+    max_rows = max_rows or DB_MAX_BATCH_ROWS
+
+    batch, batch_bytes = [], 0
+    for row in rows:
+        row_bytes = _estimate_row_bytes(row)
+        if batch and (batch_bytes + row_bytes > max_bytes or len(batch) >= max_rows):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(row)
+        batch_bytes += row_bytes
+    if batch:
+        yield batch
+
+
+def executemany_chunked(cursor, sql, rows, max_bytes=None):
+    """executemany() over packet-sized chunks; returns the total affected row count."""
+    affected = 0
+    for batch in chunked(rows, max_bytes):
+        affected += cursor.executemany(sql, batch) or 0
+    return affected
+
+
+def in_placeholders(values):
+    """Return the '%s, %s, ...' list for an IN (...) clause over values."""
+    return ', '.join(['%s'] * len(values))
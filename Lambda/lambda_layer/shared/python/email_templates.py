@@ -0,0 +1,191 @@
+"""HTML and plain-text templates for the weather and flight emails.
+
+The static parts of each template are built once per container and rows are
+rendered with bound str.format methods and joined, instead of re-creating
+the whole document with += for every message. Run this file directly to
+time rendering 10k weather reports:
+
+    python email_templates.py
+"""
+
+LOGO_URL  = "https://trip-planner-logos.s3.us-east-2.amazonaws.com/logo1.png"
+ICON_BASE = "https://trip-planner-logos.s3.us-east-2.amazonaws.com/weather/icons/"
+CELL      = 'style="padding:10px;border:1px solid #ccc;"'
+HEAD_CELL = 'style="padding:10px;border:1px solid #ccc;text-align:left;"'
+
+# 100-word adventurous greeting
+GREETING = (
+    "As you prepare for your journey, we understand how important it is to know what Mother Nature "
+    "has planned. That’s why our Trip Planner team has prepared a comprehensive, personalized "
+    "weather greeting just for you. Think of this as your friendly companion, guiding you through "
+    "sunshine, clouds, or raindrops—with tips on attire, activities, and even indoor escapes. "
+    "Whether you’re chasing sunrise on the beach, cozying up at a café, or exploring a museum, "
+    "our report will help you pack smart and seize every moment. Enjoy the journey and let the "
+    "forecast lead the way!"
+)
+
+SIGN_OFF      = '<p style="font-size:0.9em;color:#666;">— Warm regards,<br/>The Trip Planner Team</p>'
+TEXT_SIGN_OFF = "— Warm regards,\nThe Trip Planner Team"
+
+
+def _frame_open(title):
+    return (
+        '<div style="font-family:Verdana,sans-serif;max-width:600px;margin:auto;'
+        'border:1px solid #ddd;border-radius:8px;overflow:hidden;'
+        'box-shadow:0 2px 8px rgba(0,0,0,0.1);">'
+        '<div style="background:#459E95;color:#fff;padding:16px;text-align:center;">'
+        f'<img src="{LOGO_URL}" alt="Trip Planner" style="height:40px;vertical-align:middle;margin-right:8px;" />'
+        f'<h1 style="display:inline-block;margin:0;font-size:24px;vertical-align:middle;">{title}</h1>'
+        '</div>'
+        '<div style="padding:20px;color:#333;line-height:1.5;">'
+    )
+
+
+def _table_open(columns):
+    heads = ''.join(f'<th {HEAD_CELL}>{c}</th>' for c in columns)
+    return (
+        '<table style="width:100%;border-collapse:collapse;margin:20px 0;">'
+        f'<thead><tr style="background:#f0f0f0;">{heads}</tr></thead><tbody>'
+    )
+
+
+# ---------------------------------------------------------------------------
+# Weather report
+# ---------------------------------------------------------------------------
+
+WEATHER_SUBJECT = "☀️ Trip Planner Weather Report: {start_city} → {destination}".format
+
+_WEATHER_HEAD = (
+    _frame_open('Weather Report')
+    + '<p>Hi <strong>{name}</strong>,</p>'
+    + f'<p>{GREETING}</p>'
+    + '<p>Here’s the {days}-day forecast for your trip from <strong>{start_city}</strong> '
+      'to <strong>{destination}</strong>:</p>'
+    + _table_open(['Date', 'Condition', 'Temp (°C)', 'Precip (%)', 'Humidity (%)', 'Wind (m/s)', 'Recommendation'])
+).format
+_WEATHER_ROW = (
+    f'<tr><td {CELL}>{{date}}</td>'
+    f'<td {CELL}><img src="{ICON_BASE}{{icon}}.png" alt="{{condition}}" '
+    'style="height:24px;vertical-align:middle;margin-right:4px;"/>{condition}</td>'
+    f'<td {CELL}>{{temp_min}}–{{temp_max}}</td>'
+    f'<td {CELL}>{{precip}}%</td>'
+    f'<td {CELL}>{{humidity}}</td>'
+    f'<td {CELL}>{{wind}}</td>'
+    f'<td {CELL}>{{recommendation}}</td></tr>'
+).format
+_WEATHER_FOOT = '</tbody></table>' + SIGN_OFF + '</div></div>'
+
+_WEATHER_TEXT_HEAD = (
+    "Hi {name},\n\n" + GREETING + "\n\n"
+    "Here’s the {days}-day forecast for your trip from {start_city} to {destination}:\n\n"
+).format
+_WEATHER_TEXT_ROW = (
+    "{date}: {condition}, {temp_min}–{temp_max}°C, precip {precip}%, "
+    "humidity {humidity}%, wind {wind} m/s\n  {recommendation}\n"
+).format
+
+
+def weather_report(data):
+    """(subject, html, text) for a weather report message."""
+    name        = data.get('name', 'Traveler')
+    start_city  = data['start_city']
+    destination = data['destination']
+    weather     = data.get('weather', [])
+
+    head = {'name': name, 'days': len(weather), 'start_city': start_city, 'destination': destination}
+    rows = [{**w, 'icon': w['condition'].lower(), 'precip': w.get('precipitation', 0)} for w in weather]
+
+    html = ''.join([_WEATHER_HEAD(**head), *(_WEATHER_ROW(**r) for r in rows), _WEATHER_FOOT])
+    text = ''.join([_WEATHER_TEXT_HEAD(**head), *(_WEATHER_TEXT_ROW(**r) for r in rows), '\n', TEXT_SIGN_OFF])
+    return WEATHER_SUBJECT(start_city=start_city, destination=destination), html, text
+
+
+# ---------------------------------------------------------------------------
+# Flight alert
+# ---------------------------------------------------------------------------
+
+FLIGHT_SUBJECT = "✈️ Trip Planner Flight Update"
+
+FLIGHT_INTRO = (
+    "Your journey is our top priority—and we want to make sure you’re never caught off‑guard by "
+    "last‑minute changes. Our real‑time monitoring has detected updates to your upcoming flight itinerary:"
+)
+FLIGHT_ADVICE = (
+    "We understand how stressful unexpected delays or cancellations can be.  We recommend visiting "
+    "the airline’s official website for the most up‑to‑the‑minute details—and to explore alternative "
+    "flight options if needed."
+)
+FLIGHT_CLOSING = (
+    "Your peace of mind matters to us. Trip Planner remains committed to guiding you—every step of the "
+    "way—to a smooth, worry‑free journey. Should you have any questions or need further assistance, "
+    "don’t hesitate to reach out to our support team."
+)
+LIVE_STATUS_URL = "https://aviationstack.com/"
+
+_FLIGHT_HEAD = (
+    _frame_open('Flight Alert')
+    + '<p>Hi <strong>{name}</strong>,</p>'
+    + f'<p>{FLIGHT_INTRO}</p>'
+    + _table_open(['Flight', 'Status', 'New Departure'])
+).format
+_FLIGHT_ROW = (
+    f'<tr><td {CELL}>{{ticket}}</td>'
+    '<td style="padding:10px;border:1px solid #ccc;text-transform:capitalize;">{status}</td>'
+    f'<td {CELL}>{{depart_time}}</td></tr>'
+).format
+_FLIGHT_FOOT = (
+    '</tbody></table>'
+    f'<p>{FLIGHT_ADVICE}</p>'
+    '<p style="text-align:center;margin:30px 0;">'
+    f'<a href="{LIVE_STATUS_URL}" style="background:#459E95;color:#fff;padding:12px 24px;'
+    'text-decoration:none;border-radius:4px;display:inline-block;">Check Live Status</a></p>'
+    f'<p>{FLIGHT_CLOSING}</p>'
+    + SIGN_OFF + '</div></div>'
+)
+
+_FLIGHT_TEXT_HEAD = ("Hi {name},\n\n" + FLIGHT_INTRO + "\n\n").format
+_FLIGHT_TEXT_ROW = "{ticket}: {status}, departs {depart_time}\n".format
+_FLIGHT_TEXT_FOOT = (
+    f"\n{FLIGHT_ADVICE}\n\nCheck live status: {LIVE_STATUS_URL}\n\n{FLIGHT_CLOSING}\n\n{TEXT_SIGN_OFF}"
+)
+
+
+def flight_alert(data):
+    """(subject, html, text) for a flight alert message."""
+    name = data.get('name', 'Traveler')
+    rows = []
+    for f in data.get('flights', []):
+        status = f['status'].lower()
+        rows.append({
+            'ticket': f['ticket'],
+            'status': status,
+            'depart_time': 'TBD' if status == 'cancelled' else f['depart_time']
+        })
+
+    html = ''.join([_FLIGHT_HEAD(name=name), *(_FLIGHT_ROW(**r) for r in rows), _FLIGHT_FOOT])
+    text = ''.join([_FLIGHT_TEXT_HEAD(name=name), *(_FLIGHT_TEXT_ROW(**r) for r in rows), _FLIGHT_TEXT_FOOT])
+    return FLIGHT_SUBJECT, html, text
+
+
+def benchmark(reports=10000, days=5):
+    """Time rendering weather reports (html + text); returns seconds."""
+    import time
+    data = {
+        'name': 'Traveler', 'start_city': 'Boston', 'destination': 'New York',
+        'weather': [{
+            'date': f'2025-01-0{d + 1}', 'condition': 'Clouds', 'temp_min': 3, 'temp_max': 9,
+            'precipitation': 40, 'humidity': 70, 'wind': 4.2,
+            'recommendation': 'Bring a light jacket.'
+        } for d in range(days)]
+    }
+    t0 = time.perf_counter()
+    for _ in range(reports):
+        weather_report(data)
+    return time.perf_counter() - t0
+
+
+if __name__ == '__main__':
+    reports = 10000
+    seconds = benchmark(reports)
+    print(f"rendered {reports} weather reports in {seconds * 1000:.1f} ms "
+          f"({seconds * 1000 / reports:.3f} ms per report)")
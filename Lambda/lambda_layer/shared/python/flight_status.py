@@ -0,0 +1,104 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import requests
+
+from rate_limit import TokenBucket
+
+logger = logging.getLogger()
+
+FLIGHT_API_KEY            = os.environ.get('FLIGHT_API_KEY')
+FLIGHT_API_URL            = 'http://api.aviationstack.com/v1/flights'
+FLIGHT_MAX_CONCURRENCY    = int(os.environ.get('FLIGHT_MAX_CONCURRENCY', 8))
+FLIGHT_TIMEOUT_SECONDS    = float(os.environ.get('FLIGHT_TIMEOUT_SECONDS', 5))
+# Requests per second, and the most requests one run may spend of the plan's quota
+FLIGHT_API_RATE           = float(os.environ.get('FLIGHT_API_RATE', 5))
+FLIGHT_API_BUDGET_PER_RUN = int(os.environ.get('FLIGHT_API_BUDGET_PER_RUN', 500))
+
+
+def flight_key(flight_iata, departure):
+    """Dedup key for a flight: (flight IATA code, departure date 'YYYY-MM-DD')."""
+    return flight_iata.strip().upper(), departure.date().isoformat()
+
+
+def to_utc(local_dt, tz_name):
+    """Naive UTC datetime for a naive local time in the IANA zone tz_name, or None if the zone is unknown."""
+    if local_dt is None or not tz_name:
+        return None
+    try:
+        zone = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("Unknown timezone %r", tz_name)
+        return None
+    return local_dt.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_status(flight):
+    """(status, departure datetime or None, departure timezone or None) from an aviationstack flight record.
+
+    aviationstack reports times in the departure airport's local time (the
+    "+00:00" suffix it sends is not a real offset), so the departure is
+    returned naive and local; use to_utc() with the timezone to compare it
+    against UTC.
+    """
+    status = (flight.get('flight_status') or '').lower()
+    dep = flight.get('departure') or {}
+    est = dep.get('estimated') or dep.get('scheduled')
+    depart = None
+    if est:
+        depart = datetime.fromisoformat(est.replace('Z', '+00:00')).replace(tzinfo=None)
+    return status, depart, dep.get('timezone')
+
+
+def fetch_flight(key, limiter=None):
+    """Current aviationstack record for a (flight_iata, date) key, or None."""
+    flight_iata, flight_date = key
+    if limiter:
+        limiter.acquire()
+    resp = requests.get(
+        FLIGHT_API_URL,
+        params={'access_key': FLIGHT_API_KEY, 'flight_iata': flight_iata},
+        timeout=FLIGHT_TIMEOUT_SECONDS
+    )
+    resp.raise_for_status()
+    data = resp.json().get('data') or []
+    # Prefer the leg scheduled on the ticket's date; the API lists recent and upcoming legs
+    for flight in data:
+        if ((flight.get('departure') or {}).get('scheduled') or '').startswith(flight_date):
+            return flight
+    return data[0] if data else None
+
+
+def fetch_flights(keys, budget=None):
+    """Fetch each distinct (flight_iata, date) once, concurrently and rate limited.
+
+    keys should be ordered by priority: only the first `budget` distinct keys
+    are requested and the rest are skipped until the next run. Returns
+    {key: (status, departure, timezone) or None}; failed and skipped keys map to None.
+    """
+    keys = list(dict.fromkeys(keys))
+    budget = FLIGHT_API_BUDGET_PER_RUN if budget is None else budget
+    if len(keys) > budget:
+        logger.warning("Flight API budget allows %d of %d flights this run", budget, len(keys))
+    todo = keys[:budget]
+    results = dict.fromkeys(keys)
+    if not todo:
+        return results
+
+    limiter = TokenBucket(FLIGHT_API_RATE)
+
+    def fetch(key):
+        try:
+            flight = fetch_flight(key, limiter)
+            return parse_status(flight) if flight else None
+        except Exception as e:
+            logger.warning("Flight status fetch for %s on %s failed: %s", key[0], key[1], e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(FLIGHT_MAX_CONCURRENCY, len(todo))) as pool:
+        results.update(zip(todo, pool.map(fetch, todo)))
+    logger.info("Fetched status for %d of %d flight(s)", sum(1 for v in results.values() if v), len(keys))
+    return results
@@ -0,0 +1,120 @@
+"""Forecast aggregation shared by the weather jobs.
+
+Run this file directly for a microbenchmark of bucket_forecast() against
+the original per-trip-day scan:
+
+    python forecast.py
+"""
+
+
+def bucket_forecast(forecast_list):
+    """Aggregate OpenWeatherMap 3-hour entries into per-day stats in one pass.
+
+    Returns {'YYYY-MM-DD': stats}, where stats has condition (first entry of
+    the day), temp_min/temp_max (°C, rounded), wind (mean m/s, 1 decimal),
+    humidity (mean %, rounded) and precipitation (max probability, %).
+    The result depends only on the forecast, so every trip to the same
+    city can reuse it.
+    """
+    days = {}
+    for e in forecast_list:
+        dt = e.get('dt_txt')
+        if not dt:
+            continue
+        main = e['main']
+        temp = main['temp'] - 273.15
+        acc = days.get(dt[:10])
+        if acc is None:
+            # [condition, tmin, tmax, wind_sum, hum_sum, pop_max, count]
+            days[dt[:10]] = [e['weather'][0]['main'], temp, temp,
+                             e['wind']['speed'], main['humidity'], e.get('pop', 0.0), 1]
+            continue
+        if temp < acc[1]:
+            acc[1] = temp
+        if temp > acc[2]:
+            acc[2] = temp
+        acc[3] += e['wind']['speed']
+        acc[4] += main['humidity']
+        pop = e.get('pop', 0.0)
+        if pop > acc[5]:
+            acc[5] = pop
+        acc[6] += 1
+
+    return {
+        day: {
+            'condition': condition,
+            'temp_min': round(tmin),
+            'temp_max': round(tmax),
+            'precipitation': round(pop_max * 100),
+            'humidity': round(hum_sum / count),
+            'wind': round(wind_sum / count, 1)
+        }
+        for day, (condition, tmin, tmax, wind_sum, hum_sum, pop_max, count) in days.items()
+    }
+
+
+def _scan_day(forecast_list, day):
+    """The original per-day aggregation, kept as the benchmark baseline."""
+    temps, winds, hums, pops = [], [], [], []
+    condition = None
+    for e in forecast_list:
+        dt = e.get('dt_txt')
+        if dt and dt.startswith(day):
+            main = e['main']
+            temps.append(main['temp'] - 273.15)
+            winds.append(e['wind']['speed'])
+            hums.append(main['humidity'])
+            pops.append(e.get('pop', 0.0))
+            if condition is None:
+                condition = e['weather'][0]['main']
+    if not temps:
+        return None
+    return {
+        'condition': condition,
+        'temp_min': round(min(temps)),
+        'temp_max': round(max(temps)),
+        'precipitation': round(max(pops) * 100),
+        'humidity': round(sum(hums) / len(hums)),
+        'wind': round(sum(winds) / len(winds), 1)
+    }
+
+
+def _synthetic_forecast(start, entries=40, seed=0):
+    import random
+    from datetime import datetime, timedelta
+    rng = random.Random(seed)
+    base = datetime.combine(start, datetime.min.time())
+    return [{
+        'dt_txt': (base + timedelta(hours=3 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+        'main': {'temp': rng.uniform(260, 310), 'humidity': rng.randint(20, 100)},
+        'wind': {'speed': rng.uniform(0, 15)},
+        'pop': rng.random(),
+        'weather': [{'main': rng.choice(['Clear', 'Clouds', 'Rain'])}]
+    } for i in range(entries)]
+
+
+def benchmark(trips=2000, duration=5, cities=50):
+    """Time per-trip-day scans against bucketing once per city; returns (scan_s, bucket_s)."""
+    import time
+    from datetime import date, timedelta
+    start = date(2025, 1, 1)
+    forecasts = [_synthetic_forecast(start, seed=c) for c in range(cities)]
+    days = [(start + timedelta(days=i)).isoformat() for i in range(duration)]
+
+    t0 = time.perf_counter()
+    scanned = [[_scan_day(forecasts[t % cities], d) for d in days] for t in range(trips)]
+    scan_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    buckets = [bucket_forecast(f) for f in forecasts]
+    bucketed = [[buckets[t % cities].get(d) for d in days] for t in range(trips)]
+    bucket_s = time.perf_counter() - t0
+
+    assert scanned == bucketed, "bucket_forecast disagrees with the per-day scan"
+    return scan_s, bucket_s
+
+
+if __name__ == '__main__':
+    scan_s, bucket_s = benchmark()
+    print(f"per-trip-day scan: {scan_s * 1000:.1f} ms")
+    print(f"bucket per city:   {bucket_s * 1000:.1f} ms  ({scan_s / bucket_s:.0f}x faster)")
@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import time
+from urllib.parse import quote
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger()
+
+# OpenWeatherMap refreshes the 5-day / 3-hour forecast every three hours
+FORECAST_WINDOW_SECONDS = 3 * 3600
+
+CACHE_HOST = os.environ.get('MEMCACHED_ENDPOINT')
+CACHE_PORT = int(os.environ.get('MEMCACHED_PORT', 11211))
+CACHE_POOL_SIZE = int(os.environ.get('FORECAST_CACHE_POOL_SIZE', 8))
+
+
+def _make_client():
+    if not CACHE_HOST:
+        # In-memory stand-in for local runs and tests; only shared within one container
+        logger.info("MEMCACHED_ENDPOINT not set, using in-process forecast cache")
+        return TTLCache(maxsize=1024, ttl=FORECAST_WINDOW_SECONDS)
+    from pymemcache.client.base import PooledClient
+    # The weather job reads and writes from its fetch threads; a plain Client
+    # shares one socket and isn't thread-safe
+    return PooledClient((CACHE_HOST, CACHE_PORT), connect_timeout=1, timeout=1, max_pool_size=CACHE_POOL_SIZE)
+
+
+cache = _make_client()
+
+
+def window(now=None):
+    """Index of the 3-hour forecast window containing now (epoch seconds)."""
+    return int(now if now is not None else time.time()) // FORECAST_WINDOW_SECONDS
+
+
+def seconds_left_in_window(now=None):
+    now = int(now if now is not None else time.time())
+    return FORECAST_WINDOW_SECONDS - now % FORECAST_WINDOW_SECONDS
+
+
+def cache_key(city, now=None):
+    # memcached keys may not contain spaces or control characters
+    return f"forecast:{window(now)}:{quote(city.lower(), safe='')}"[:250]
+
+
+def get(city, now=None):
+    """Cached forecast list for a city in the current window, or None."""
+    try:
+        cached = cache.get(cache_key(city, now))
+    except Exception as e:
+        logger.warning("Forecast cache get failed for %s: %s", city, e)
+        return None
+    if cached is None:
+        return None
+    if isinstance(cached, bytes):
+        cached = cached.decode('utf-8')
+    return json.loads(cached)
+
+
+def put(city, forecast_list, now=None):
+    """Cache a city's forecast until the current window ends."""
+    expire = seconds_left_in_window(now)
+    try:
+        if isinstance(cache, TTLCache):
+            cache.set(cache_key(city, now), json.dumps(forecast_list), ttl=expire)
+        else:
+            cache.set(cache_key(city, now), json.dumps(forecast_list), expire=expire)
+    except Exception as e:
+        logger.warning("Forecast cache set failed for %s: %s", city, e)
+
+
+def get_or_fetch(city, fetch):
+    """Return the cached forecast for city, calling fetch(city) and caching it on a miss.
+
+    Failed fetches (None) are not cached so a rerun tries again.
+    """
+    now = time.time()
+    forecast_list = get(city, now)
+    if forecast_list is not None:
+        return forecast_list
+    forecast_list = fetch(city)
+    if forecast_list is not None:
+        put(city, forecast_list, now)
+    return forecast_list
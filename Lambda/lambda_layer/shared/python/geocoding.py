@@ -0,0 +1,121 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+import db
+from ttl_cache import TTLCache
+
+logger = logging.getLogger()
+
+GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
+GEOCODE_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+GEOCODE_MAX_CONCURRENCY = int(os.environ.get('GEOCODE_MAX_CONCURRENCY', 4))
+
+# address -> {'lat', 'lng', 'place_id'}, or {} when the address could not be geocoded
+_geocodes = TTLCache(maxsize=4096, ttl=24 * 3600)
+
+
+def has_coordinates(location):
+    return location.get('lat') is not None and location.get('lng') is not None
+
+
+def geocode_address(address):
+    """Resolve a free-text address through the Geocoding API (cached per container)."""
+    cached = _geocodes.get(address)
+    if cached is not None:
+        return cached or None
+
+    response = requests.get(GEOCODE_URL, params={'address': address, 'key': GOOGLE_MAPS_API_KEY}, timeout=5)
+    data = response.json()
+    result = {}
+    if data.get('status') == 'OK' and data.get('results'):
+        top = data['results'][0]
+        result = {
+            'lat': top['geometry']['location']['lat'],
+            'lng': top['geometry']['location']['lng'],
+            'place_id': top.get('place_id')
+        }
+    elif data.get('status') != 'ZERO_RESULTS':
+        # Quota or transient errors: don't remember the miss
+        raise Exception('Geocoding failed: ' + data.get('error_message', data.get('status', 'unknown')))
+    _geocodes.set(address, result)
+    return result or None
+
+
+def _safe_geocode(address):
+    """geocode_address() result, {} when the address has no match, or None when the lookup failed."""
+    try:
+        return geocode_address(address) or {}
+    except Exception as e:
+        logger.warning("Geocoding %s failed: %s", address, str(e))
+        return None
+
+
+def _update_coordinates(cursor, rows):
+    """Write (id, lat, lng, place_id, geocoded_at) rows with one UPDATE ... CASE per chunk.
+
+    A plain UPDATE (not an upsert) so a location deleted in the meantime
+    stays deleted.
+    """
+    for batch in db.chunked(rows):
+        ids = [row[0] for row in batch]
+        cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+        params = []
+        for column in range(1, 5):
+            params += [value for row in batch for value in (row[0], row[column])]
+        cursor.execute(f"""
+            UPDATE locations
+            SET lat         = CASE id {cases} END,
+                lng         = CASE id {cases} END,
+                place_id    = CASE id {cases} END,
+                geocoded_at = CASE id {cases} END
+            WHERE id IN ({db.in_placeholders(ids)})
+        """, params + ids)
+
+
+def ensure_coordinates(conn, locations):
+    """Fill in lat/lng on location dicts that lack them and persist the results.
+
+    Each dict needs id, name and address (lat/lng/place_id are updated in
+    place). Distinct addresses are geocoded once, concurrently, and every
+    newly resolved row is written back with one batched UPDATE.
+    Returns (number of locations that gained coordinates, locations whose
+    address the Geocoding API had no match for). Locations whose lookup
+    failed (quota, timeout, server error) are in neither, so they can be
+    retried later.
+    """
+    missing = [loc for loc in locations if not has_coordinates(loc) and (loc.get('address') or loc.get('name'))]
+    if not missing:
+        return 0, []
+
+    queries = list(dict.fromkeys(loc.get('address') or loc.get('name') for loc in missing))
+    workers = min(GEOCODE_MAX_CONCURRENCY, len(queries))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        resolved = dict(zip(queries, pool.map(_safe_geocode, queries)))
+
+    now = datetime.utcnow()
+    rows = {}
+    not_found = []
+    for loc in missing:
+        result = resolved.get(loc.get('address') or loc.get('name'))
+        if result is None:
+            continue
+        if not result:
+            not_found.append(loc)
+            continue
+        loc.update(result)
+        if loc.get('id'):
+            rows[loc['id']] = (loc['id'], result['lat'], result['lng'], result['place_id'], now)
+
+    with conn.cursor() as cursor:
+        _update_coordinates(cursor, list(rows.values()))
+    logger.info("Geocoded %d of %d location(s), %d not found", len(rows), len(missing), len(not_found))
+    return len(rows), not_found
+
+
+def point(location):
+    """(lat, lng) floats for a location dict with coordinates."""
+    return float(location['lat']), float(location['lng'])
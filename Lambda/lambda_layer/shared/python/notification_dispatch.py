@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from rate_limit import TokenBucket
+
+logger = logging.getLogger()
+
+sqs = boto3.client('sqs')
+ses = boto3.client('ses')
+
+# SES sends per second; when unset the account's MaxSendRate is read once per container
+SES_MAX_SEND_RATE  = os.environ.get('SES_MAX_SEND_RATE')
+EMAIL_CONCURRENCY  = int(os.environ.get('EMAIL_CONCURRENCY', 8))
+RECEIVE_BATCH_SIZE = 10  # SQS maximum per receive_message / delete_message_batch
+# Stop pulling new batches when the invocation has less than this left
+DISPATCH_SAFETY_MS = int(os.environ.get('DISPATCH_SAFETY_MS', 15000))
+
+_bucket = None
+
+
+def send_rate_limiter():
+    """Container-wide token bucket sized to the SES send rate."""
+    global _bucket
+    if _bucket is None:
+        rate = SES_MAX_SEND_RATE
+        if rate is None:
+            try:
+                rate = ses.get_send_quota()['MaxSendRate']
+            except Exception as e:
+                logger.warning("Could not read SES send quota, assuming 1/s: %s", e)
+                rate = 1
+        _bucket = TokenBucket(float(rate))
+    return _bucket
+
+
+def send_email(sender, to, subject, html, text=None):
+    body = {'Html': {'Data': html}}
+    if text:
+        body['Text'] = {'Data': text}
+    send_rate_limiter().acquire()
+    ses.send_email(
+        Source=sender,
+        Destination={'ToAddresses': [to]},
+        Message={
+            'Subject': {'Data': subject},
+            'Body':    body
+        }
+    )
+
+
+def _deliver(body, message_id, render, sender):
+    """Render and send one message body; returns True when it can be deleted."""
+    try:
+        send_email(sender, *render(json.loads(body)))
+        return True
+    except Exception as e:
+        logger.error("Failed to deliver message %s: %s", message_id, e)
+        return False
+
+
+def acknowledge(queue_url, messages):
+    """Delete delivered messages with one delete_message_batch call; returns the number deleted."""
+    if not messages:
+        return 0
+    resp = sqs.delete_message_batch(
+        QueueUrl=queue_url,
+        Entries=[{'Id': str(i), 'ReceiptHandle': m['ReceiptHandle']} for i, m in enumerate(messages)]
+    )
+    for failure in resp.get('Failed', []):
+        logger.warning("Delete failed for entry %s: %s", failure['Id'], failure.get('Message'))
+    return len(resp.get('Successful', []))
+
+
+def drain(queue_url, render, sender, context=None):
+    """Receive, render and send everything on queue_url.
+
+    render(data) maps a decoded message body to (to, subject, html) or
+    (to, subject, html, text) for a plain-text alternative. Each
+    batch of 10 is sent concurrently under the SES rate limit and then
+    acknowledged in one call; messages that fail stay on the queue and are
+    redelivered after the visibility timeout. Returns per-run stats.
+    """
+    started = time.monotonic()
+    stats = {'received': 0, 'sent': 0, 'failed': 0}
+    with ThreadPoolExecutor(max_workers=EMAIL_CONCURRENCY) as pool:
+        while True:
+            if context is not None and context.get_remaining_time_in_millis() < DISPATCH_SAFETY_MS:
+                logger.warning("Stopping early to stay within the invocation timeout")
+                break
+            resp = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=RECEIVE_BATCH_SIZE, WaitTimeSeconds=1)
+            msgs = resp.get('Messages', [])
+            if not msgs:
+                break
+            delivered = list(pool.map(lambda m: _deliver(m['Body'], m.get('MessageId'), render, sender), msgs))
+            acknowledge(queue_url, [m for m, ok in zip(msgs, delivered) if ok])
+            stats['received'] += len(msgs)
+            stats['sent'] += sum(delivered)
+            stats['failed'] += len(msgs) - sum(delivered)
+
+    elapsed = time.monotonic() - started
+    stats['seconds'] = round(elapsed, 2)
+    stats['per_second'] = round(stats['sent'] / elapsed, 2) if elapsed else 0.0
+    logger.info("Dispatched %(sent)d of %(received)d message(s), %(failed)d failed, "
+                "in %(seconds)ss (%(per_second)s/s)", stats)
+    return stats
+
+
+def handle_records(records, render, sender):
+    """Deliver an SQS event-source batch.
+
+    Lambda deletes the batch itself, so nothing is acknowledged here;
+    messages that fail are returned as batchItemFailures (the event source
+    mapping needs ReportBatchItemFailures) and only those are retried.
+    """
+    started = time.monotonic()
+    workers = max(1, min(EMAIL_CONCURRENCY, len(records)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        delivered = list(pool.map(lambda r: _deliver(r['body'], r['messageId'], render, sender), records))
+
+    failures = [{'itemIdentifier': r['messageId']} for r, ok in zip(records, delivered) if not ok]
+    logger.info("Delivered %d of %d record(s) in %.2fs", len(records) - len(failures), len(records),
+                time.monotonic() - started)
+    return {'batchItemFailures': failures}
@@ -0,0 +1,152 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(a, b):
+    """Great-circle distance in km between two (lat, lng) points."""
+    lat1, lng1 = map(math.radians, a)
+    lat2, lng2 = map(math.radians, b)
+    h = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def distance_matrix(points):
+    """Symmetric matrix of haversine distances between (lat, lng) points."""
+    n = len(points)
+    matrix = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            matrix[i][j] = matrix[j][i] = haversine_km(points[i], points[j])
+    return matrix
+
+
+def path_length(order, matrix):
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def nearest_neighbour(matrix, start=0):
+    """Greedy open path from start that always visits the closest remaining point."""
+    order = [start]
+    remaining = set(range(len(matrix))) - {start}
+    while remaining:
+        last = order[-1]
+        nxt = min(remaining, key=lambda j: (matrix[last][j], j))
+        order.append(nxt)
+        remaining.remove(nxt)
+    return order
+
+
+def two_opt(order, matrix, max_passes=50):
+    """Reverse sub-paths while that shortens the open path; order[0] stays fixed."""
+    order = list(order)
+    n = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b, c = order[i - 1], order[i], order[j]
+                d = order[j + 1] if j + 1 < n else None
+                before = matrix[a][b] + (matrix[c][d] if d is not None else 0.0)
+                after = matrix[a][c] + (matrix[b][d] if d is not None else 0.0)
+                if after < before - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def or_opt(order, matrix, max_segment=3, max_passes=50):
+    """Move runs of up to max_segment stops (either direction) to a cheaper spot; order[0] stays fixed."""
+    order = list(order)
+    best = path_length(order, matrix)
+    for _ in range(max_passes):
+        improved = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, len(order) - length + 1):
+                segment = order[i:i + length]
+                rest = order[:i] + order[i + length:]
+                for pos in range(1, len(rest) + 1):
+                    if pos == i:
+                        continue
+                    for candidate_segment in (segment, segment[::-1]):
+                        candidate = rest[:pos] + candidate_segment + rest[pos:]
+                        cost = path_length(candidate, matrix)
+                        if cost < best - 1e-9:
+                            order, best, improved = candidate, cost, True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+        if not improved:
+            break
+    return order
+
+
+def optimize_order(start, stops):
+    """Visiting order for stops on an open path from start.
+
+    start and stops are (lat, lng) points; returns indexes into stops.
+    Nearest-neighbour construction followed by 2-opt and Or-opt passes.
+    """
+    if len(stops) < 2:
+        return list(range(len(stops)))
+    matrix = distance_matrix([start] + list(stops))
+    order = nearest_neighbour(matrix)
+    order = two_opt(order, matrix)
+    order = or_opt(order, matrix)
+    order = two_opt(order, matrix)
+    return [i - 1 for i in order[1:]]
+
+
+def decode_polyline(encoded):
+    """Decode a Google encoded polyline into a list of (lat, lng) points."""
+    points, index, lat, lng = [], 0, 0, 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift, result = 0, 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / 1e5, lng / 1e5))
+    return points
+
+
+def encode_polyline(points):
+    """Encode (lat, lng) points as a Google encoded polyline."""
+    out, prev_lat, prev_lng = [], 0, 0
+    for lat, lng in points:
+        lat_e5, lng_e5 = int(round(lat * 1e5)), int(round(lng * 1e5))
+        for delta in (lat_e5 - prev_lat, lng_e5 - prev_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lng = lat_e5, lng_e5
+    return ''.join(out)
+
+
+def join_polylines(encoded_polylines):
+    """Concatenate consecutive route segments into one encoded polyline."""
+    points = []
+    for encoded in encoded_polylines:
+        segment = decode_polyline(encoded)
+        # Each segment starts where the previous one ended
+        if points and segment and segment[0] == points[-1]:
+            segment = segment[1:]
+        points.extend(segment)
+    return encode_polyline(points)
@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+import time
+
+import boto3
+
+logger = logging.getLogger()
+
+sqs = boto3.client('sqs')
+
+MAX_BATCH_ENTRIES = 10           # SQS limit per send_message_batch
+MAX_BATCH_BYTES   = 256 * 1024   # SQS limit per message and per batch payload
+SEND_MAX_RETRIES  = int(os.environ.get('SQS_SEND_MAX_RETRIES', 3))
+
+
+class BufferedProducer:
+    """Accumulates messages for one queue and sends them with send_message_batch.
+
+    A batch is flushed when it reaches 10 entries or the 256 KB payload limit,
+    and on flush()/exit of a with-block. Entries that fail for transient
+    reasons are retried on their own; keys of messages that were accepted or
+    given up on are collected in .sent and .failed.
+
+        with BufferedProducer(QUEUE_URL) as producer:
+            for report in reports:
+                producer.send(report, key=report['id'])
+    """
+
+    def __init__(self, queue_url, client=None, max_retries=SEND_MAX_RETRIES):
+        self.queue_url = queue_url
+        self.client = client or sqs
+        self.max_retries = max_retries
+        self.sent = []
+        self.failed = []
+        self._entries = []
+        self._bytes = 0
+
+    def send(self, body, key=None):
+        """Buffer a message (a str, or anything json.dumps accepts)."""
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        size = len(body.encode('utf-8'))
+        if size > MAX_BATCH_BYTES:
+            raise ValueError(f"SQS message of {size} bytes exceeds the {MAX_BATCH_BYTES} byte limit")
+        if len(self._entries) >= MAX_BATCH_ENTRIES or self._bytes + size > MAX_BATCH_BYTES:
+            self._send_batch()
+        self._entries.append((key, body))
+        self._bytes += size
+
+    def flush(self):
+        """Send anything still buffered; returns the keys accepted so far."""
+        if self._entries:
+            self._send_batch()
+        return self.sent
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def _send_batch(self):
+        pending = dict(enumerate(self._entries))
+        self._entries, self._bytes = [], 0
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(0.2 * 2 ** (attempt - 1))
+            try:
+                resp = self.client.send_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{'Id': str(i), 'MessageBody': body} for i, (_, body) in pending.items()]
+                )
+            except Exception as e:
+                logger.warning("send_message_batch failed (attempt %d): %s", attempt + 1, e)
+                continue
+
+            for ok in resp.get('Successful', []):
+                self.sent.append(pending.pop(int(ok['Id']))[0])
+            for failure in resp.get('Failed', []):
+                if failure.get('SenderFault'):
+                    # Malformed entries won't succeed on retry
+                    logger.error("SQS rejected message %s: %s", failure['Id'], failure.get('Message'))
+                    self.failed.append(pending.pop(int(failure['Id']))[0])
+            if not pending:
+                return
+
+        logger.error("Giving up on %d SQS message(s) after %d attempt(s)", len(pending), self.max_retries + 1)
+        self.failed.extend(key for key, _ in pending.values())
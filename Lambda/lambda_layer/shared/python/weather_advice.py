@@ -0,0 +1,117 @@
+"""Weather recommendations for the daily forecast reports.
+
+The first-match wildcard matrix is compiled once at import into an exact
+lookup table; Lambda/test_weather_advice.py checks it against the original
+first-match scan for every condition and band combination.
+"""
+import itertools
+
+# —————————————
+# Recommendation matrix
+# —————————————
+RECOMMENDATIONS = {
+    # Clear
+    "Clear|cold|any|calm":    "Insulated coat, scarf & hat. ❄️ Outdoor hike or golden‑hour photos.",
+    "Clear|cold|any|breezy":  "Insulated coat, scarf & hat. Brisk walk—stay layered.",
+    "Clear|cool|any|calm":    "Light jacket & long sleeves. 🚶 City tour or café patio.",
+    "Clear|cool|any|breezy":  "Light jacket & windbreaker. 🚶 Urban stroll.",
+    "Clear|mild|any|calm":    "T‑shirt + light pants. 🚴 Biking or picnic.",
+    "Clear|mild|any|breezy":  "T‑shirt + light pants. ☀️ Al fresco brunch.",
+    "Clear|warm|any|calm":    "Shorts & breathable top + sunglasses. 🏖️ Beach or pool.",
+    "Clear|warm|any|breezy":  "Shorts & breathable top. 🏖️ Beach stroll.",
+    "Clear|hot|low|calm":     "Tank top & shorts, sunhat, sunscreen. 🏊‍♀️ Swim or mall (AC breaks).",
+    "Clear|hot|high|calm":    "Moisture‑wicking fabrics & sunhat. 🌳 Shaded park or museum.",
+    # Clouds
+    "Clouds|cold|any|calm":   "Warm coat & layers. ☕ Café or indoor museum.",
+    "Clouds|cold|any|breezy": "Warm layers + wind‑proof jacket. 🏛️ Indoor museum, cozy café.",
+    "Clouds|cool|any|calm":   "Light jacket & long sleeves. 🚶 City stroll.",
+    "Clouds|cool|any|breezy": "Light layers & windbreaker. 🚶 Gallery visits.",
+    "Clouds|mild|any|calm":   "Long‑sleeve top & trousers. ☕ Rooftop café or light hike.",
+    "Clouds|mild|any|breezy": "Light sweater & trousers. ☕ Patio or park walk.",
+    "Clouds|warm|any|calm":   "Long‑sleeve top & light pants. ☀️ Al fresco brunch.",
+    "Clouds|warm|any|breezy": "Long‑sleeve + windbreaker. 🚴 Scenic bike ride.",
+    "Clouds|hot|any|calm":     "Light layers & breathable fabrics. 🌤️ Gentle hike or city stroll.",
+    "Clouds|hot|any|breezy":   "Windbreaker & light pants. 🌤️ Breezy outdoor walking or outdoor café.",
+    # Rain & co.
+    "Rain|any|any|any":           "Waterproof jacket, boots & umbrella. 🏞️ Waterfall tour or aquarium.",
+    "Drizzle|any|any|any":        "Light raincoat & water‑resistant shoes. 🛋️ Bookstore or indoor market.",
+    "Thunderstorm|any|any|any":   "Stay dry—avoid outdoor plans. 🎥 Cinema or spa.",
+    # Snow
+    "Snow|any|any|any":           "Heavy coat, insulated boots, gloves & hat. ⛷️ Ski or snow‑shoe walk.",
+    # Atmosphere
+    "Mist|any|any|calm":          "Layers & high‑visibility jacket. 🚗 Drive carefully or brief stroll.",
+    "Mist|any|any|breezy":        "Layers & wind‑proof coat. 🚗 Short indoor visits.",
+    "Fog|any|any|any":            "Warm layers & reflective gear. 🚗 Stay cautious on drives.",
+    "Haze|any|any|any":           "Light mask & long sleeves. 🌬️ Indoor air‑conditioned spots.",
+    "Smoke|any|any|any":          "Protective mask & long sleeves. 🌬️ Indoor AC, light activity.",
+    "Dust|any|any|any":           "Goggles & scarf over mouth. 🏜️ Quick outdoor stop, indoor visits.",
+    "Sand|any|any|any":           "Goggles & scarf. 🏜️ Short outdoor stop, indoor refuge.",
+    "Ash|any|any|any":            "Mask & long clothing. 🛖 Stay indoors if possible.",
+    # Extreme
+    "Squall|any|any|high":        "Emergency gear—stay indoors. 🛑 Shelter in place.",
+    "Tornado|any|any|any":        "Seek immediate shelter. 🚨 Follow local warnings.",
+    # fallback
+    "default":                    "Dress comfortably and check a local weather app for last‑minute updates!"
+}
+
+TEMP_BANDS     = ('cold', 'cool', 'mild', 'warm', 'hot')
+HUMIDITY_BANDS = ('high', 'low')
+WIND_BANDS     = ('calm', 'breezy', 'high')
+
+# Stands in for any condition the matrix doesn't name
+OTHER_CONDITION = object()
+
+
+def bands(stats):
+    """(temp, humidity, wind) bands for a day's stats."""
+    tmax = stats['temp_max']
+    havg = stats['humidity']
+    wavg = stats['wind']
+
+    if tmax <= 10: tb='cold'
+    elif tmax <= 20: tb='cool'
+    elif tmax <= 25: tb='mild'
+    elif tmax <= 30: tb='warm'
+    else: tb='hot'
+    hb = 'high' if havg >= 60 else 'low'
+    wb = 'calm' if wavg <= 5 else 'breezy' if wavg <= 10 else 'high'
+    return tb, hb, wb
+
+
+def scan_recommendation(key_parts):
+    """Reference lookup: first matrix key whose parts all match or are 'any'."""
+    return next((v for k,v in RECOMMENDATIONS.items()
+                 if k!='default' and all(kp==cp or kp=='any'
+                     for kp,cp in zip(k.split('|'), key_parts))),
+                RECOMMENDATIONS['default'])
+
+
+def compile_recommendations():
+    """Expand the wildcard matrix into {(condition, tb, hb, wb): recommendation}.
+
+    Every combination of named condition and band is resolved with the
+    first-match scan, so precedence is exactly the matrix order.
+    """
+    conditions = {k.split('|')[0] for k in RECOMMENDATIONS if k != 'default'} - {'any'}
+    table = {}
+    for combo in itertools.product(conditions, TEMP_BANDS, HUMIDITY_BANDS, WIND_BANDS):
+        table[combo] = scan_recommendation(combo)
+    for tb, hb, wb in itertools.product(TEMP_BANDS, HUMIDITY_BANDS, WIND_BANDS):
+        # Only rows with an 'any' condition can match an unnamed one
+        table[(OTHER_CONDITION, tb, hb, wb)] = scan_recommendation((None, tb, hb, wb))
+    return table, frozenset(conditions)
+
+
+_TABLE, _CONDITIONS = compile_recommendations()
+
+
+def lookup(condition, tb, hb, wb):
+    if condition not in _CONDITIONS:
+        condition = OTHER_CONDITION
+    return _TABLE.get((condition, tb, hb, wb), RECOMMENDATIONS['default'])
+
+
+def recommend(stats):
+    """Recommendation for a day's stats (condition, temp_max, humidity, wind)."""
+    return lookup(stats['condition'], *bands(stats))
+
@@ -0,0 +1,42 @@
+import os, json, logging
+import db
+
+logger = logging.getLogger()
+logger.setLevel(logging.DEBUG)
+
+# Alerts are only compared against while the flight is upcoming
+RETENTION_DAYS = int(os.environ.get('FLIGHT_ALERT_RETENTION_DAYS', 2))
+PRUNE_BATCH    = int(os.environ.get('FLIGHT_ALERT_PRUNE_BATCH', 5000))
+
+PRUNE_QUERIES = (
+    # departed flights
+    """DELETE FROM flight_alerts
+       WHERE depart_time < DATE_SUB(NOW(), INTERVAL %s DAY)
+       LIMIT %s""",
+    # cancellations recorded without a departure time
+    """DELETE FROM flight_alerts
+       WHERE depart_time IS NULL AND alerted_at < DATE_SUB(NOW(), INTERVAL %s DAY)
+       LIMIT %s""",
+)
+
+def handler(event, context):
+    logger.debug("=== Flight Alert Pruner start ===")
+    conn = db.get_connection()
+    deleted = 0
+    try:
+        # Small batches keep each delete's locks short; autocommit commits every batch
+        for sql in PRUNE_QUERIES:
+            while True:
+                if context and context.get_remaining_time_in_millis() < 10000:
+                    logger.warning("Running out of time; the next run prunes the rest")
+                    break
+                with conn.cursor() as cur:
+                    cur.execute(sql, (RETENTION_DAYS, PRUNE_BATCH))
+                    deleted += cur.rowcount
+                if cur.rowcount < PRUNE_BATCH:
+                    break
+    finally:
+        db.release(conn)
+
+    logger.info("Pruned %d flight alert(s)", deleted)
+    return {'statusCode': 200, 'body': json.dumps({'deleted': deleted})}
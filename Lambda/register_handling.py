@@ -1,17 +1,8 @@
 import json
-import os
 import uuid
-import pymysql
+import db
 import datetime
 
-# Database configuration
-db_config = {
-    'host': os.environ['DB_HOST'],
-    'user': os.environ['DB_USER'],
-    'password': os.environ['DB_PASSWORD'],
-    'database': os.environ['DB_NAME']
-}
-
 def lambda_handler(event, context):
     try:
         # Log incoming event
@@ -34,13 +25,7 @@ def lambda_handler(event, context):
         current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         # Create connection to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            database=db_config['database'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = db.get_dict_connection()
         
         try:
             with connection.cursor() as cursor:
@@ -76,7 +61,7 @@ def lambda_handler(event, context):
                 })
             }
         finally:
-            connection.close()
+            db.release(connection)
             
     except Exception as e:
         print(f"Error saving user data: {str(e)}")
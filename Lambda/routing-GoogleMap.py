@@ -1,49 +1,80 @@
 import os
 import json
-import pymysql
+import hashlib
+import db
 import requests
+import geocoding
+import route_optimizer
+from concurrent.futures import ThreadPoolExecutor
 
 # === Config ===
 API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY")
-DB_HOST = os.environ["DB_HOST"]
-DB_USER = os.environ["DB_USER"]
-DB_PASSWORD = os.environ["DB_PASSWORD"]
-DB_NAME = os.environ["DB_NAME"]
-
-def get_db_connection():
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+ROUTING_MAX_CONCURRENCY = int(os.environ.get("ROUTING_MAX_CONCURRENCY", 4))
+# Directions accepts at most this many intermediate waypoints per request
+DIRECTIONS_MAX_WAYPOINTS = int(os.environ.get("DIRECTIONS_MAX_WAYPOINTS", 25))
+DIRECTIONS_URL = "https://maps.googleapis.com/maps/api/directions/json"
 
-def check_existing_daily_route(conn, trip_id, day_number):
+def query_daily_routes(conn, trip_id):
     with conn.cursor() as cursor:
         cursor.execute(
-            "SELECT * FROM daily_routes WHERE trip_id = %s AND day_number = %s",
-            (trip_id, day_number)
+            "SELECT * FROM daily_routes WHERE trip_id = %s",
+            (trip_id,)
         )
-        return cursor.fetchone()
+        return {r["day_number"]: r for r in cursor.fetchall()}
+
+def route_fingerprint(start_id, place_ids):
+    # Keyed by location ids, not names: route_cache is shared across trips and
+    # names like "Hotel" repeat between cities. Directions reorders the waypoints
+    # itself, so the input order doesn't change the route.
+    payload = json.dumps([str(start_id), sorted(str(i) for i in place_ids)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-def insert_daily_route(conn, trip_id, day_number, polyline, origin, destination, ordered_places):
+def query_route_cache(conn, fingerprints):
+    if not fingerprints:
+        return {}
     with conn.cursor() as cursor:
-        cursor.execute("""
-            INSERT INTO daily_routes (trip_id, day_number, polyline, origin, destination, waypoints)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            trip_id,
-            day_number,
-            polyline,
-            origin,
-            destination,
-            json.dumps(ordered_places)
-        ))
-    conn.commit()
-
-def get_directions_polyline_optimized(start, places):
-    response = requests.get("https://maps.googleapis.com/maps/api/directions/json", params={
+        cursor.execute(
+            f"SELECT * FROM route_cache WHERE fingerprint IN ({db.in_placeholders(fingerprints)})",
+            list(fingerprints)
+        )
+        return {r["fingerprint"]: r for r in cursor.fetchall()}
+
+def save_daily_routes(conn, trip_id, routes, stale_days):
+    """Replace stale daily_routes rows and add new routes to the shared cache in one transaction."""
+    if not routes and not stale_days:
+        return
+    with db.transaction(conn), conn.cursor() as cursor:
+        if stale_days:
+            cursor.execute(
+                f"DELETE FROM daily_routes WHERE trip_id = %s AND day_number IN ({db.in_placeholders(stale_days)})",
+                [trip_id] + list(stale_days)
+            )
+        cursor.executemany("""
+            INSERT INTO daily_routes (trip_id, day_number, polyline, origin, destination, waypoints, fingerprint)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [(
+            r["trip_id"],
+            r["day_number"],
+            r["polyline"],
+            r["origin"],
+            r["destination"],
+            json.dumps(r["waypoints"]),
+            r["fingerprint"]
+        ) for r in routes])
+        # Only routes fetched from Directions are new to the shared cache
+        cursor.executemany("""
+            INSERT IGNORE INTO route_cache (fingerprint, origin, destination, polyline, waypoints)
+            VALUES (%s, %s, %s, %s, %s)
+        """, [(
+            r["fingerprint"],
+            r["origin"],
+            r["destination"],
+            r["polyline"],
+            json.dumps(r["waypoints"])
+        ) for r in routes if r["source"] == "generated"])
+
+def get_directions_polyline_optimized(start, places, names=None):
+    response = requests.get(DIRECTIONS_URL, params={
         "origin": start,
         "destination": places[-1] if places else start,
         "waypoints": "optimize:true|" + "|".join(places[:-1]) if len(places) > 1 else None,
@@ -55,15 +86,71 @@ def get_directions_polyline_optimized(start, places):
         route = data["routes"][0]
         polyline = route["overview_polyline"]["points"]
         ordered_indexes = route.get("waypoint_order", list(range(len(places) - 1)))
-        ordered_places = [places[i] for i in ordered_indexes] + [places[-1]]
+        names = names or places
+        ordered_places = [names[i] for i in ordered_indexes] + [names[-1]]
         return polyline, ordered_places
     else:
         raise Exception("Google Maps API failed: " + data.get("error_message", data["status"]))
 
+def stop_query(location):
+    """What to send Directions for a stop: its coordinates when known, else its name."""
+    if geocoding.has_coordinates(location):
+        lat, lng = geocoding.point(location)
+        return f"{lat},{lng}"
+    return location["name"]
+
+def order_places_locally(start, places):
+    """Order places with the local TSP optimizer, or None if any stop has no coordinates."""
+    if not all(geocoding.has_coordinates(loc) for loc in [start] + places):
+        return None
+    order = route_optimizer.optimize_order(
+        geocoding.point(start),
+        [geocoding.point(p) for p in places]
+    )
+    return [places[i] for i in order]
+
+def get_directions_polyline(stops):
+    """Polyline through stops in the given order, one Directions request per DIRECTIONS_MAX_WAYPOINTS waypoints."""
+    step = DIRECTIONS_MAX_WAYPOINTS + 1
+    polylines = []
+    for i in range(0, len(stops) - 1, step):
+        segment = stops[i:i + step + 1]
+        response = requests.get(DIRECTIONS_URL, params={
+            "origin": segment[0],
+            "destination": segment[-1],
+            "waypoints": "|".join(segment[1:-1]) or None,
+            "key": API_KEY
+        }, timeout=5)
+
+        data = response.json()
+        if data["status"] != "OK":
+            raise Exception("Google Maps API failed: " + data.get("error_message", data["status"]))
+        polylines.append(data["routes"][0]["overview_polyline"]["points"])
+    return route_optimizer.join_polylines(polylines)
+
+def get_directions_route(start, places):
+    """Order the day's places in-process, then fetch the polyline for that fixed order.
+
+    start and places are location dicts (name plus lat/lng when geocoded);
+    returns (polyline, ordered place names).
+    """
+    ordered_places = order_places_locally(start, places)
+    if ordered_places is None:
+        # Without coordinates fall back to Google's optimizer while the day fits in one request
+        if len(places) - 1 <= DIRECTIONS_MAX_WAYPOINTS:
+            return get_directions_polyline_optimized(
+                stop_query(start), [stop_query(p) for p in places], [p["name"] for p in places]
+            )
+        ordered_places = places
+    polyline = get_directions_polyline([stop_query(loc) for loc in [start] + ordered_places])
+    return polyline, [p["name"] for p in ordered_places]
+
 def query_everyday_rows(conn, trip_id):
     with conn.cursor() as cursor:
         cursor.execute("""
-            SELECT e.id AS everyday_id, e.day_number, l.name AS start_location_name
+            SELECT e.id AS everyday_id, e.day_number,
+                   l.id AS start_location_id, l.name AS start_location_name,
+                   l.address AS start_location_address, l.lat AS start_lat, l.lng AS start_lng
             FROM everyday e
             JOIN locations l ON l.address = e.start_location
             WHERE e.trip_id = %s
@@ -71,16 +158,42 @@ def query_everyday_rows(conn, trip_id):
         """, (trip_id,))
         return cursor.fetchall()
 
-def query_places_for_day(conn, everyday_id):
+def query_places_for_trip(conn, trip_id):
     with conn.cursor() as cursor:
         cursor.execute("""
-            SELECT l.name
+            SELECT el.everyday_id, l.id, l.name, l.address, l.lat, l.lng
             FROM everyday_locations el
+            JOIN everyday e ON el.everyday_id = e.id
             JOIN locations l ON el.location_id = l.id
-            WHERE el.everyday_id = %s
-        """, (everyday_id,))
-        rows = cursor.fetchall()
-        return [r["name"] for r in rows]
+            WHERE e.trip_id = %s
+        """, (trip_id,))
+        places = {}
+        for r in cursor.fetchall():
+            places.setdefault(r.pop("everyday_id"), []).append(r)
+        return places
+
+def compute_routes(days):
+    """Call Directions for every (day_number, start, places) concurrently, capped at ROUTING_MAX_CONCURRENCY.
+
+    Returns ({day_number: (polyline, ordered_places)}, [errors]) so the days that
+    did succeed can still be cached when another day fails.
+    """
+    if not days:
+        return {}, []
+    routes, errors = {}, []
+    workers = min(ROUTING_MAX_CONCURRENCY, len(days))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            day_number: pool.submit(get_directions_route, start, places)
+            for day_number, start, places in days
+        }
+        for day_number, f in futures.items():
+            try:
+                routes[day_number] = f.result()
+            except Exception as e:
+                print(f"[ERROR] Route generation failed for day {day_number}:", str(e))
+                errors.append(e)
+    return routes, errors
 
 # === Lambda Handler ===
 def lambda_handler(event, context):
@@ -93,25 +206,38 @@ def lambda_handler(event, context):
 
         print(f"[DEBUG] Using trip_id: {trip_id}")
 
-        conn = get_db_connection()
+        conn = db.get_dict_connection()
         everyday_rows = query_everyday_rows(conn, trip_id)
         print(f"[DEBUG] Found {len(everyday_rows)} day(s).")
 
-        results = []
+        places_by_day = query_places_for_trip(conn, trip_id)
+        cached_routes = query_daily_routes(conn, trip_id)
+
+        results = {}
+        pending = []
+        stale_days = []
 
         for row in everyday_rows:
             day_number = row["day_number"]
-            start = row["start_location_name"]
-            places = query_places_for_day(conn, row["everyday_id"])
+            start = {
+                "id": row["start_location_id"],
+                "name": row["start_location_name"],
+                "address": row["start_location_address"],
+                "lat": row["start_lat"],
+                "lng": row["start_lng"]
+            }
+            places = places_by_day.get(row["everyday_id"], [])
 
             if not places:
                 print(f"[WARN] No places found for day {day_number}, skipping.")
                 continue
 
-            existing = check_existing_daily_route(conn, trip_id, day_number)
-            if existing:
+            # A cached route is only valid for the start and places it was computed from
+            fingerprint = route_fingerprint(start["id"], [p["id"] for p in places])
+            existing = cached_routes.get(day_number)
+            if existing and existing.get("fingerprint") == fingerprint:
                 print(f"[DEBUG] Using cached route for day {day_number}")
-                results.append({
+                results[day_number] = {
                     "trip_id": trip_id,
                     "day_number": day_number,
                     "origin": existing["origin"],
@@ -119,22 +245,59 @@ def lambda_handler(event, context):
                     "polyline": existing["polyline"],
                     "waypoints": json.loads(existing["waypoints"]),
                     "source": "db"
-                })
+                }
+                continue
+
+            if existing:
+                print(f"[DEBUG] Cached route for day {day_number} is stale")
+                stale_days.append(day_number)
+            pending.append((day_number, start, places, fingerprint))
+
+        # Days with the same start and places on any trip (e.g. clones) share one route
+        shared_routes = query_route_cache(conn, {p[3] for p in pending})
+        to_generate = [(d, st, pl) for d, st, pl, fp in pending if fp not in shared_routes]
+
+        # Coordinates are geocoded once per location and stored on the locations table
+        geocoding.ensure_coordinates(conn, [loc for _, st, pl in to_generate for loc in [st] + pl])
+
+        # Remaining days hit the Directions API in parallel
+        print(f"[DEBUG] Reusing {len(pending) - len(to_generate)} shared route(s), generating {len(to_generate)}.")
+        generated, errors = compute_routes(to_generate)
+
+        new_routes = []
+        for day_number, start, places, fingerprint in pending:
+            shared = shared_routes.get(fingerprint)
+            if shared:
+                route = {
+                    "trip_id": trip_id,
+                    "day_number": day_number,
+                    "origin": shared["origin"],
+                    "destination": shared["destination"],
+                    "polyline": shared["polyline"],
+                    "waypoints": json.loads(shared["waypoints"]),
+                    "source": "shared"
+                }
+            elif day_number in generated:
+                polyline, ordered_places = generated[day_number]
+                destination = ordered_places[-1] if ordered_places else start["name"]
+                route = {
+                    "trip_id": trip_id,
+                    "day_number": day_number,
+                    "origin": start["name"],
+                    "destination": destination,
+                    "polyline": polyline,
+                    "waypoints": ordered_places,
+                    "source": "generated"
+                }
+            else:
                 continue
+            results[day_number] = route
+            new_routes.append(dict(route, fingerprint=fingerprint))
 
-            polyline, ordered_places = get_directions_polyline_optimized(start, places)
-            destination = ordered_places[-1] if ordered_places else start
-            insert_daily_route(conn, trip_id, day_number, polyline, start, destination, ordered_places)
-
-            results.append({
-                "trip_id": trip_id,
-                "day_number": day_number,
-                "origin": start,
-                "destination": destination,
-                "polyline": polyline,
-                "waypoints": ordered_places,
-                "source": "generated"
-            })
+        save_daily_routes(conn, trip_id, new_routes, stale_days)
+        if errors:
+            raise errors[0]
+        results = [results[day_number] for day_number in sorted(results)]
 
         return {
             "statusCode": 200,
@@ -3,37 +3,12 @@ import json
 import logging
 from uuid import uuid4
 from datetime import datetime
-import os
-import pymysql
+import db
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Database connection variables from environment
-DB_HOST = os.environ.get('DB_HOST')
-DB_NAME = os.environ.get('DB_NAME')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-
-# Initialize database connection
-def get_db_connection():
-    try:
-        if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD]):
-            raise ValueError("Missing required database environment variables")
-            
-        conn = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5
-        )
-        return conn
-    except Exception as e:
-        logger.error("Database connection error: %s", str(e))
-        raise
-
 def lambda_handler(event, context):
     """Lambda function to save trip data to Aurora MySQL."""
     logger.info('Received event: %s', json.dumps(event))
@@ -69,12 +44,8 @@ def lambda_handler(event, context):
             logger.error('Validation failed: Missing required trip data')
             return format_response(400, {'error': 'Missing required trip data'})
         
-        # Log DB connection attempt
-        logger.info('Attempting database connection to %s/%s as %s', DB_HOST, DB_NAME, DB_USER)
-        
-        # Get database connection
-        conn = get_db_connection()
-        logger.info('Database connection successful')
+        # Get database connection (reused across warm invocations)
+        conn = db.get_connection()
         
         try:
             with conn.cursor() as cursor:
@@ -132,59 +103,17 @@ def lambda_handler(event, context):
                     datetime.now().isoformat()
                 ))
                 
-                # 2. Save all location records with duplication check
-                location_id_map = {}  # Map original IDs to new UUIDs
+                # 2. Resolve every location in one lookup and bulk-insert the new ones
+                location_id_map = resolve_location_ids(cursor, locations)
                 
-                for location in locations:
-                    original_id = location.get('id')
-                    location_name = location.get('name')
-                    location_address = location.get('address')
-                    
-                    # Check if location with this address already exists instead of name
-                    check_location_sql = """
-                    SELECT id FROM locations WHERE address = %s LIMIT 1
-                    """
-                    
-                    cursor.execute(check_location_sql, (location_address,))
-                    existing_location = cursor.fetchone()
-                    
-                    if existing_location:
-                        # Use existing location ID
-                        location_id = existing_location[0]
-                        logger.info(f"Using existing location with address: {location_address}, ID: {location_id}")
-                    else:
-                        # Create new location ID and insert
-                        location_id = str(uuid4())
-                        
-                        location_sql = """
-                        INSERT INTO locations (id, name, address)
-                        VALUES (%s, %s, %s)
-                        """
-                        
-                        cursor.execute(location_sql, (
-                            location_id,
-                            location_name,
-                            location.get('address')
-                        ))
-                        logger.info(f"Created new location: {location_name} with ID: {location_id}")
-                    
-                    # Map the original ID to either the existing or new ID
-                    location_id_map[original_id] = location_id
-                
-                # 3. Save everyday records
+                # 3. Save everyday records in bulk
                 day_id_map = {}  # Map original day IDs to new UUIDs
+                day_rows = []
                 
                 for day in everyday:
-                    original_id = day.get('id')
                     day_id = str(uuid4())
-                    day_id_map[original_id] = day_id
-                    
-                    day_sql = """
-                    INSERT INTO everyday (id, trip_id, current_city, day_number, start_location)
-                    VALUES (%s, %s, %s, %s, %s)
-                    """
-                    
-                    cursor.execute(day_sql, (
+                    day_id_map[day.get('id')] = day_id
+                    day_rows.append((
                         day_id,
                         trip_id,
                         day.get('current_city'),
@@ -192,26 +121,29 @@ def lambda_handler(event, context):
                         day.get('start_location')
                     ))
                 
-                # 4. Save everyday_locations mappings
+                day_sql = """
+                INSERT INTO everyday (id, trip_id, current_city, day_number, start_location)
+                VALUES (%s, %s, %s, %s, %s)
+                """
+                db.executemany_chunked(cursor, day_sql, day_rows)
+                
+                # 4. Save everyday_locations mappings in bulk
+                relation_rows = []
+                
                 for relation in everyday_locations:
-                    original_day_id = relation.get('everyday_id')
-                    original_location_id = relation.get('location_id')
-                    
                     # Get the new UUIDs using our mapping
-                    new_day_id = day_id_map.get(original_day_id)
-                    new_location_id = location_id_map.get(original_location_id)
+                    new_day_id = day_id_map.get(relation.get('everyday_id'))
+                    new_location_id = location_id_map.get(relation.get('location_id'))
                     
                     if new_day_id and new_location_id:
-                        relation_sql = """
-                        INSERT INTO everyday_locations (id, everyday_id, location_id)
-                        VALUES (%s, %s, %s)
-                        """
-                        
-                        cursor.execute(relation_sql, (
-                            str(uuid4()),
-                            new_day_id,
-                            new_location_id
-                        ))
+                        relation_rows.append((str(uuid4()), new_day_id, new_location_id))
+                
+                relation_sql = """
+                INSERT INTO everyday_locations (id, everyday_id, location_id)
+                VALUES (%s, %s, %s)
+                """
+                db.executemany_chunked(cursor, relation_sql, relation_rows)
+                logger.info(f"Saved {len(day_rows)} days and {len(relation_rows)} activities for trip {trip_id}")
                 
                 # Commit the transaction
                 conn.commit()
@@ -221,7 +153,7 @@ def lambda_handler(event, context):
             logger.error("Database error: %s", str(db_error))
             raise
         finally:
-            conn.close()
+            db.release(conn)
         
         # Return success with the trip ID
         return format_response(200, {
@@ -236,6 +168,58 @@ def lambda_handler(event, context):
             'details': str(e)
         })
 
+def resolve_location_ids(cursor, locations):
+    """Map request location IDs to location rows, reusing rows with the same address.
+    
+    Existing addresses are found with chunked join lookups and all missing
+    locations are inserted with a single executemany, instead of one SELECT and
+    one INSERT per location.
+    """
+    addresses = list(dict.fromkeys(
+        location.get('address') for location in locations if location.get('address') is not None
+    ))
+    
+    # Check which addresses already exist instead of matching on name. Joining
+    # against the requested values lets MySQL compare with the column's
+    # collation (case- and trailing-space-insensitive, like the old
+    # address = %s lookup) and hands back the address exactly as requested.
+    address_ids = {}
+    for batch in db.chunked(addresses):
+        requested = " UNION ALL ".join(["SELECT %s AS address"] + ["SELECT %s"] * (len(batch) - 1))
+        cursor.execute(f"""
+            SELECT requested.address, l.id
+            FROM ({requested}) AS requested
+            JOIN locations l ON l.address = requested.address
+        """, batch)
+        for address, location_id in cursor.fetchall():
+            address_ids.setdefault(address, location_id)
+    logger.info(f"Found {len(address_ids)} of {len(addresses)} location addresses already stored")
+    
+    location_id_map = {}  # Map original IDs to existing or new UUIDs
+    new_rows = []
+    
+    for location in locations:
+        address = location.get('address')
+        location_id = address_ids.get(address) if address is not None else None
+        
+        if not location_id:
+            location_id = str(uuid4())
+            new_rows.append((location_id, location.get('name'), address))
+            # Later entries with the same address reuse this new row
+            if address is not None:
+                address_ids[address] = location_id
+        
+        location_id_map[location.get('id')] = location_id
+    
+    location_sql = """
+    INSERT INTO locations (id, name, address)
+    VALUES (%s, %s, %s)
+    """
+    db.executemany_chunked(cursor, location_sql, new_rows)
+    logger.info(f"Created {len(new_rows)} new locations")
+    
+    return location_id_map
+
 def format_response(status_code, body):
     """Helper to format response in API Gateway format"""
     return {
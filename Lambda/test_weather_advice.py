@@ -0,0 +1,24 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'lambda_layer', 'shared', 'python'))
+
+import weather_advice
+from weather_advice import HUMIDITY_BANDS, TEMP_BANDS, WIND_BANDS
+
+NAMED_CONDITIONS = sorted({k.split('|')[0] for k in weather_advice.RECOMMENDATIONS if k != 'default'})
+
+
+@pytest.mark.parametrize('condition', NAMED_CONDITIONS + ['Unknown', '', None])
+def test_lookup_matches_first_match_scan(condition):
+    for bands in itertools.product(TEMP_BANDS, HUMIDITY_BANDS, WIND_BANDS):
+        combo = (condition,) + bands
+        assert weather_advice.lookup(*combo) == weather_advice.scan_recommendation(combo), combo
+
+
+def test_recommend_uses_banded_stats():
+    stats = {'condition': 'Clear', 'temp_max': 35, 'humidity': 80, 'wind': 2}
+    assert weather_advice.recommend(stats) == weather_advice.RECOMMENDATIONS['Clear|hot|high|calm']
@@ -1,10 +1,9 @@
 import json
-import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import base64
 import mimetypes
-import pymysql
+import db
 import boto3
 from openai import OpenAI
 
@@ -19,8 +18,8 @@ For each ticket found, output an object with exactly these fields:
   • if flight: carrier code + number (e.g. "AA1579")
   • if train: full train name (e.g. "151 Northeast Regional")
   • if bus: full bus name if present, otherwise "N/A"
-- departure_datetime: ISO 8601 string in the **departure city's local timezone**
-- arrival_datetime: ISO 8601 string in the **arrival city's local timezone**
+- departure_datetime: ISO 8601 string in the **departure city's local timezone**, with its UTC offset (e.g. "2025-05-01T08:30:00-04:00")
+- arrival_datetime: ISO 8601 string in the **arrival city's local timezone**, with its UTC offset
 - departure_city: extract only the city name. 
     • Strip any station names, codes, state info, parentheses, dashes or arrows.
     • Trim whitespace and convert to Title Case.
@@ -35,14 +34,6 @@ Return a JSON array of these objects and nothing else.
 
 USER_PROMPT = "Please extract all tickets from the uploaded document and return the JSON."
 
-# Database configuration
-db_config = {
-    'host': os.environ['DB_HOST'],
-    'user': os.environ['DB_USER'],
-    'password': os.environ['DB_PASSWORD'],
-    'database': os.environ['DB_NAME']
-}
-
 def lambda_handler(event, context):
     # 1) Parse out the S3 Bucket name and ticket file name. 
     rec = event['Records'][0]['s3']
@@ -113,14 +104,10 @@ def lambda_handler(event, context):
             raise ValueError(f"Ticket #{idx} missing fields: {missing}")
 
     # 7) Fetch user_id using user_email and insert tickets into database
-    conn = pymysql.connect(
-        host=db_config['host'],
-        user=db_config['user'],
-        password=db_config['password'],
-        database=db_config['database'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    conn = db.get_dict_connection()
     try:
+        # Insert all tickets from the document atomically
+        conn.begin()
         with conn.cursor() as cur:
             # Lookup user_id by email
             cur.execute("SELECT id FROM users WHERE email = %s", (user_email,))
@@ -133,16 +120,18 @@ def lambda_handler(event, context):
             insert_sql = """
                 INSERT INTO tickets
                   (id, user_id, type, ticket_number,
-                   departure_datetime, arrival_datetime,
+                   departure_datetime, arrival_datetime, departure_utc,
                    departure_city, arrival_city,
                    departure_code, arrival_code, seats)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
             """
             for t in tickets:
-                dep_dt = datetime.fromisoformat(t["departure_datetime"])
-                arr_dt = datetime.fromisoformat(t["arrival_datetime"])
+                dep_dt = datetime.fromisoformat(t["departure_datetime"].replace("Z", "+00:00"))
+                arr_dt = datetime.fromisoformat(t["arrival_datetime"].replace("Z", "+00:00"))
                 dep_local = dep_dt.replace(tzinfo=None)
                 arr_local = arr_dt.replace(tzinfo=None)
+                # Without an offset the flight job fills this in from the airport's timezone
+                dep_utc = dep_dt.astimezone(timezone.utc).replace(tzinfo=None) if dep_dt.tzinfo else None
                 ticket_id = str(uuid.uuid4())
                 cur.execute(insert_sql, (
                     ticket_id,
@@ -151,6 +140,7 @@ def lambda_handler(event, context):
                     t["ticket_number"],
                     dep_local,
                     arr_local,
+                    dep_utc,
                     t["departure_city"],
                     t["arrival_city"],
                     t.get("departure_code"),
@@ -159,7 +149,7 @@ def lambda_handler(event, context):
                 ))
         conn.commit()
     finally:
-        conn.close()
+        db.release(conn)
 
     return {
         "statusCode": 200,
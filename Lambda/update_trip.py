@@ -1,7 +1,6 @@
 import json
 import logging
-import os
-import pymysql
+import db
 from uuid import uuid4
 from datetime import date, datetime
 
@@ -9,30 +8,6 @@ from datetime import date, datetime
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Database connection variables from environment
-DB_HOST = os.environ.get('DB_HOST')
-DB_NAME = os.environ.get('DB_NAME')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-
-# Initialize database connection
-def get_db_connection():
-    try:
-        if not all([DB_HOST, DB_NAME, DB_USER, DB_PASSWORD]):
-            raise ValueError("Missing required database environment variables")
-            
-        conn = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5
-        )
-        return conn
-    except Exception as e:
-        logger.error("Database connection error: %s", str(e))
-        raise
-
 def lambda_handler(event, context):
     """Lambda function to update trip data in Aurora MySQL."""
     logger.info('Received event: %s', json.dumps(event))
@@ -73,7 +48,7 @@ def lambda_handler(event, context):
             return format_response(400, {'error': 'Missing required trip data'})
         
         # Get database connection
-        conn = get_db_connection()
+        conn = db.get_connection()
         
         try:
             with conn.cursor() as cursor:
@@ -110,129 +85,8 @@ def lambda_handler(event, context):
                     trip_id
                 ))
                 
-                # 2. Process activities
-                for activity in activities:
-                    if activity.get('_deleted'):
-                        # Delete activity if it's marked for deletion
-                        if 'id' in activity and not activity['id'].startswith('new-'):
-                            # Find the everyday_location entry for this activity
-                            find_everyday_location_sql = """
-                            SELECT id, everyday_id, location_id
-                            FROM everyday_locations
-                            WHERE id = %s
-                            """
-                            
-                            cursor.execute(find_everyday_location_sql, (activity['id'],))
-                            el_result = cursor.fetchone()
-                            
-                            if el_result:
-                                # Delete the everyday_location entry
-                                delete_el_sql = "DELETE FROM everyday_locations WHERE id = %s"
-                                cursor.execute(delete_el_sql, (activity['id'],))
-                    
-                    elif activity.get('_new'):
-                        # Create a new activity
-                        day_number = activity.get('day_number', 1)
-                        
-                        # Find the everyday ID for this day number
-                        find_everyday_sql = """
-                        SELECT id FROM everyday
-                        WHERE trip_id = %s AND day_number = %s
-                        """
-                        
-                        cursor.execute(find_everyday_sql, (trip_id, day_number))
-                        everyday_result = cursor.fetchone()
-                        
-                        everyday_id = None
-                        
-                        if everyday_result:
-                            everyday_id = everyday_result[0]
-                        else:
-                            # Create new everyday record
-                            everyday_id = str(uuid4())
-                            create_everyday_sql = """
-                            INSERT INTO everyday (id, trip_id, day_number, current_city)
-                            VALUES (%s, %s, %s, %s)
-                            """
-                            
-                            cursor.execute(create_everyday_sql, (
-                                everyday_id,
-                                trip_id,
-                                day_number,
-                                trip.get('start_city')
-                            ))
-                        
-                        # Create or find location - Only store name and address, not description
-                        location_name = activity.get('name', 'Unnamed Activity')
-                        # Use address if available, or just the name
-                        location_address = activity.get('address', location_name)
-                        
-                        find_location_sql = """
-                        SELECT id FROM locations
-                        WHERE name = %s AND address = %s
-                        LIMIT 1
-                        """
-                        
-                        cursor.execute(find_location_sql, (location_name, location_address))
-                        location_result = cursor.fetchone()
-                        
-                        location_id = None
-                        
-                        if location_result:
-                            location_id = location_result[0]
-                        else:
-                            # Create new location - Without description field
-                            location_id = str(uuid4())
-                            create_location_sql = """
-                            INSERT INTO locations (id, name, address)
-                            VALUES (%s, %s, %s)
-                            """
-                            
-                            cursor.execute(create_location_sql, (
-                                location_id,
-                                location_name,
-                                location_address
-                            ))
-                        
-                        # Create everyday_locations mapping
-                        create_el_sql = """
-                        INSERT INTO everyday_locations (id, everyday_id, location_id)
-                        VALUES (%s, %s, %s)
-                        """
-                        
-                        cursor.execute(create_el_sql, (
-                            str(uuid4()),
-                            everyday_id,
-                            location_id
-                        ))
-                    
-                    elif activity.get('_modified'):
-                        # Update existing activity if it's modified
-                        if 'id' in activity and not activity['id'].startswith('new-'):
-                            # Get the location ID from the everyday_locations table
-                            find_location_id_sql = """
-                            SELECT location_id
-                            FROM everyday_locations
-                            WHERE id = %s
-                            """
-                            
-                            cursor.execute(find_location_id_sql, (activity['id'],))
-                            location_result = cursor.fetchone()
-                            
-                            if location_result:
-                                location_id = location_result[0]
-                                
-                                # Update the location name - Description is not stored
-                                update_location_sql = """
-                                UPDATE locations
-                                SET name = %s
-                                WHERE id = %s
-                                """
-                                
-                                cursor.execute(update_location_sql, (
-                                    activity.get('name', 'Unnamed Activity'),
-                                    location_id
-                                ))
+                # 2. Apply the activity diff as grouped, batched statements
+                results = apply_activity_changes(cursor, trip_id, trip, activities)
                 
                 # Commit the transaction
                 conn.commit()
@@ -241,7 +95,8 @@ def lambda_handler(event, context):
                 return format_response(200, {
                     'success': True,
                     'message': 'Trip updated successfully',
-                    'tripId': trip_id
+                    'tripId': trip_id,
+                    'results': results
                 })
                 
         except Exception as db_error:
@@ -250,7 +105,7 @@ def lambda_handler(event, context):
             logger.error(f"Database error: {str(db_error)}", exc_info=True)
             raise
         finally:
-            conn.close()
+            db.release(conn)
             
     except Exception as e:
         logger.error(f'Error updating trip: {str(e)}', exc_info=True)
@@ -259,6 +114,165 @@ def lambda_handler(event, context):
             'details': str(e)
         })
 
+def is_persisted(activity):
+    """True for activities that already have an everyday_locations row."""
+    return 'id' in activity and not str(activity['id']).startswith('new-')
+
+def day_number_of(activity):
+    """Day number of a new activity, normalised to match everyday.day_number keys."""
+    day_number = activity.get('day_number', 1)
+    try:
+        return int(day_number)
+    except (TypeError, ValueError):
+        return day_number
+
+def apply_activity_changes(cursor, trip_id, trip, activities):
+    """Apply the edit_trip activity diff and return one result per activity.
+    
+    The trip's day map and activity -> location map are prefetched once, then
+    deletes, inserts and updates are each applied as a single batched statement
+    (chunked for very large diffs) instead of a lookup and write per item.
+    """
+    results = [None] * len(activities)
+    
+    # Group the diff; the flag precedence matches the editor: deleted > new > modified
+    deletes, inserts, updates = [], [], []
+    for index, activity in enumerate(activities):
+        if activity.get('_deleted'):
+            deletes.append(index)
+        elif activity.get('_new'):
+            inserts.append(index)
+        elif activity.get('_modified'):
+            updates.append(index)
+        else:
+            results[index] = {'id': activity.get('id'), 'action': 'none', 'status': 'unchanged'}
+    
+    # Prefetch the trip's days and existing activities
+    cursor.execute("SELECT id, day_number FROM everyday WHERE trip_id = %s", (trip_id,))
+    day_ids = {}
+    for everyday_id, day_number in cursor.fetchall():
+        day_ids.setdefault(day_number, everyday_id)
+    
+    cursor.execute("""
+    SELECT el.id, el.location_id
+    FROM everyday_locations el
+    JOIN everyday e ON el.everyday_id = e.id
+    WHERE e.trip_id = %s
+    """, (trip_id,))
+    activity_locations = dict(cursor.fetchall())
+    
+    # Deletes: one DELETE ... IN (...) for every activity that belongs to this trip
+    delete_ids = []
+    for index in deletes:
+        activity = activities[index]
+        if is_persisted(activity) and activity['id'] in activity_locations:
+            delete_ids.append(activity['id'])
+            results[index] = {'id': activity['id'], 'action': 'delete', 'status': 'deleted'}
+        else:
+            results[index] = {'id': activity.get('id'), 'action': 'delete', 'status': 'not_found'}
+    
+    for batch in db.chunked(delete_ids):
+        cursor.execute(
+            f"DELETE FROM everyday_locations WHERE id IN ({db.in_placeholders(batch)})",
+            batch
+        )
+    
+    # Inserts: create missing days and locations in bulk, then all mappings at once
+    if inserts:
+        new_day_rows = []
+        for index in inserts:
+            day_number = day_number_of(activities[index])
+            if day_number not in day_ids:
+                day_ids[day_number] = str(uuid4())
+                new_day_rows.append((day_ids[day_number], trip_id, day_number, trip.get('start_city')))
+        
+        create_everyday_sql = """
+        INSERT INTO everyday (id, trip_id, day_number, current_city)
+        VALUES (%s, %s, %s, %s)
+        """
+        db.executemany_chunked(cursor, create_everyday_sql, new_day_rows)
+        
+        # Only store name and address, not description; address falls back to the name
+        pairs = []
+        for index in inserts:
+            location_name = activities[index].get('name', 'Unnamed Activity')
+            pairs.append((location_name, activities[index].get('address', location_name)))
+        
+        # Match existing rows in SQL so name/address compare with the columns'
+        # collation, and key the results by the pair exactly as requested
+        location_ids = {}
+        for batch in db.chunked(list(dict.fromkeys(pairs))):
+            requested = " UNION ALL ".join(
+                ["SELECT %s AS name, %s AS address"] + ["SELECT %s, %s"] * (len(batch) - 1)
+            )
+            cursor.execute(f"""
+            SELECT requested.name, requested.address, l.id
+            FROM ({requested}) AS requested
+            JOIN locations l ON l.name = requested.name AND l.address = requested.address
+            """, [value for pair in batch for value in pair])
+            for name, address, location_id in cursor.fetchall():
+                location_ids.setdefault((name, address), location_id)
+        
+        new_location_rows = []
+        for pair in pairs:
+            if pair not in location_ids:
+                location_ids[pair] = str(uuid4())
+                new_location_rows.append((location_ids[pair],) + pair)
+        
+        create_location_sql = """
+        INSERT INTO locations (id, name, address)
+        VALUES (%s, %s, %s)
+        """
+        db.executemany_chunked(cursor, create_location_sql, new_location_rows)
+        
+        mapping_rows = []
+        for index, pair in zip(inserts, pairs):
+            activity = activities[index]
+            everyday_location_id = str(uuid4())
+            mapping_rows.append((
+                everyday_location_id,
+                day_ids[day_number_of(activity)],
+                location_ids[pair]
+            ))
+            results[index] = {
+                'id': activity.get('id'),
+                'action': 'insert',
+                'status': 'created',
+                'newId': everyday_location_id
+            }
+        
+        create_el_sql = """
+        INSERT INTO everyday_locations (id, everyday_id, location_id)
+        VALUES (%s, %s, %s)
+        """
+        db.executemany_chunked(cursor, create_el_sql, mapping_rows)
+    
+    # Updates: rename locations with one UPDATE ... CASE; the last edit of a location wins
+    new_names = {}
+    for index in updates:
+        activity = activities[index]
+        location_id = activity_locations.get(activity['id']) if is_persisted(activity) else None
+        if location_id:
+            new_names[location_id] = activity.get('name', 'Unnamed Activity')
+            results[index] = {'id': activity['id'], 'action': 'update', 'status': 'updated'}
+        else:
+            results[index] = {'id': activity.get('id'), 'action': 'update', 'status': 'not_found'}
+    
+    for batch in db.chunked(list(new_names.items())):
+        cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+        params = [value for pair in batch for value in pair] + [location_id for location_id, _ in batch]
+        cursor.execute(f"""
+        UPDATE locations
+        SET name = CASE id {cases} END
+        WHERE id IN ({db.in_placeholders(batch)})
+        """, params)
+    
+    logger.info(
+        f'Applied {len(delete_ids)} deletes, {len(inserts)} inserts and '
+        f'{len(new_names)} location updates to trip {trip_id}'
+    )
+    return results
+
 def format_response(status_code, body):
     """Helper to format response in API Gateway format"""
     return {
@@ -1,14 +1,5 @@
 import json
-import os
-import pymysql
-
-# Database configuration
-db_config = {
-    'host': os.environ['DB_HOST'],
-    'user': os.environ['DB_USER'],
-    'password': os.environ['DB_PASSWORD'],
-    'database': os.environ['DB_NAME']
-}
+import db
 
 def lambda_handler(event, context):
     # Log the entire event for debugging
@@ -118,13 +109,7 @@ def lambda_handler(event, context):
         print(f"PROCESSING: email={email}, weather={weather}, environment={environment}, activity={activity}")
         
         # Create connection to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            database=db_config['database'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = db.get_dict_connection()
         
         try:
             with connection.cursor() as cursor:
@@ -168,7 +153,7 @@ def lambda_handler(event, context):
             }
             
         finally:
-            connection.close()
+            db.release(connection)
             
     except Exception as e:
         print(f"Error: {str(e)}")
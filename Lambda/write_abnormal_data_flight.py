@@ -1,71 +1,190 @@
-import os, json, boto3, pymysql, logging
-from datetime import datetime
-import requests
+import os, boto3, logging
+import db
+import flight_status
+import sqs_producer
+from collections import namedtuple
+from datetime import datetime, timedelta
 
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
 
-sqs            = boto3.client('sqs')
-QUEUE_URL      = os.environ['QUEUE_URL']
-DB_HOST        = os.environ['DB_HOST']
-DB_USER        = os.environ['DB_USER']
-DB_PASSWORD    = os.environ['DB_PASSWORD']
-DB_NAME        = os.environ['DB_NAME']
-FLIGHT_API_KEY = os.environ['FLIGHT_API_KEY']
+sqs       = boto3.client('sqs')
+QUEUE_URL = os.environ['QUEUE_URL']
+
+# Polling schedule: tickets are picked up LOOKAHEAD before departure, checked
+# hourly until the last CLOSE_WINDOW, then every CLOSE_INTERVAL until departure
+LOOKAHEAD      = timedelta(hours=int(os.environ.get('FLIGHT_LOOKAHEAD_HOURS', 24)))
+FAR_INTERVAL   = timedelta(minutes=int(os.environ.get('FLIGHT_FAR_INTERVAL_MINUTES', 60)))
+CLOSE_WINDOW   = timedelta(hours=int(os.environ.get('FLIGHT_CLOSE_WINDOW_HOURS', 3)))
+CLOSE_INTERVAL = timedelta(minutes=int(os.environ.get('FLIGHT_CLOSE_INTERVAL_MINUTES', 10)))
+# Tickets whose UTC departure isn't known yet are matched on local time
+# widened by the largest UTC offsets (-12:00 to +14:00)
+MAX_UTC_OFFSET = timedelta(hours=14)
+
+# One row per ticket checked in a run, with the owner's contact details joined in
+Ticket = namedtuple('Ticket', 'id ticket_number user_id departure_datetime departure_utc email name')
+
+def load_prior_alerts(conn, tickets):
+    """Last recorded alert per (user_id, ticket_number), for this run's tickets only."""
+    pairs = list(dict.fromkeys((t.user_id, t.ticket_number) for t in tickets))
+    prior = {}
+    for chunk in db.chunked(pairs):
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT ticket_number, user_id, last_status, depart_time, alerted_at FROM flight_alerts "
+                f"WHERE (user_id, ticket_number) IN ({', '.join(['(%s, %s)'] * len(chunk))})",
+                [v for pair in chunk for v in pair]
+            )
+            prior.update(((r['user_id'], r['ticket_number']), r) for r in cur)
+    return prior
+
+def record_alerts(conn, alert_rows):
+    """Upsert (ticket_number, user_id, last_status, depart_time, alerted_at) rows into flight_alerts."""
+    with conn.cursor() as cur:
+        db.executemany_chunked(cur, """
+            INSERT INTO flight_alerts
+              (ticket_number, user_id, last_status, depart_time, alerted_at)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+              last_status = VALUES(last_status),
+              depart_time = VALUES(depart_time),
+              alerted_at  = VALUES(alerted_at)
+        """, alert_rows)
+
+def revert_alerts(conn, prior, alert_rows):
+    """Put flight_alerts back to its prior state for alerts that were never enqueued.
+
+    Rows that existed before the run are restored and new ones are deleted,
+    so the next run sees the change again and re-sends it.
+    """
+    restore, remove = [], []
+    for iata, user_id, *_ in alert_rows:
+        prev = prior.get((user_id, iata))
+        if prev:
+            restore.append((iata, user_id, prev['last_status'], prev['depart_time'], prev['alerted_at']))
+        else:
+            remove.append((user_id, iata))
+
+    record_alerts(conn, restore)
+    for chunk in db.chunked(remove):
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM flight_alerts "
+                f"WHERE (user_id, ticket_number) IN ({', '.join(['(%s, %s)'] * len(chunk))})",
+                [v for pair in chunk for v in pair]
+            )
+
+def next_check_time(departure, now):
+    """When a flight departing at `departure` (UTC) should next be polled."""
+    interval = CLOSE_INTERVAL if departure - now <= CLOSE_WINDOW else FAR_INTERVAL
+    return min(now + interval, departure)
+
+def schedule_next_checks(conn, next_checks):
+    """Store next_check_at for {ticket id: datetime}.
+
+    Tickets sharing a next check time are updated together, so a run issues
+    one UPDATE per distinct time (per chunk).
+    """
+    by_time = {}
+    for ticket_id, when in next_checks.items():
+        by_time.setdefault(when, []).append(ticket_id)
+    for when, ticket_ids in by_time.items():
+        for chunk in db.chunked(ticket_ids):
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"UPDATE tickets SET next_check_at = %s WHERE id IN ({db.in_placeholders(chunk)})",
+                    [when] + chunk
+                )
+
+def record_departure_utc(conn, departures):
+    """Store departure_utc for {ticket id: datetime} with one UPDATE ... CASE per chunk."""
+    for batch in db.chunked(list(departures.items())):
+        cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+        with conn.cursor() as cur:
+            cur.execute(
+                f"UPDATE tickets SET departure_utc = CASE id {cases} END "
+                f"WHERE id IN ({db.in_placeholders(batch)})",
+                [v for pair in batch for v in pair] + [ticket_id for ticket_id, _ in batch]
+            )
 
 def handler(event, context):
     logger.debug("=== Flight Writer start ===")
-    conn = pymysql.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASSWORD,
-        database=DB_NAME, cursorclass=pymysql.cursors.DictCursor
-    )
+    conn = db.get_dict_connection()
     try:
-        # 1) Load all tickets departing tomorrow
+        # 1) Load flight tickets departing within the lookahead that are due a
+        #    check, with their owner's email & name. departure_datetime is the
+        #    departure city's local time, so the window is matched on
+        #    departure_utc where it is known.
+        now = datetime.utcnow().replace(microsecond=0)
         sql = """
             SELECT
-              ticket_number,
-              user_id,
-              departure_datetime
-            FROM tickets
-            WHERE departure_datetime BETWEEN DATE(NOW()) AND DATE_ADD(DATE(NOW()), INTERVAL 1 DAY);
+              t.id,
+              t.ticket_number,
+              t.user_id,
+              t.departure_datetime,
+              t.departure_utc,
+              u.email,
+              u.username
+            FROM tickets t
+            LEFT JOIN users u ON u.id = t.user_id
+            WHERE t.type = 'flight'
+              AND (
+                    (t.departure_utc > %s AND t.departure_utc <= %s)
+                 OR (t.departure_utc IS NULL
+                     AND t.departure_datetime > %s AND t.departure_datetime <= %s)
+              )
+              AND (t.next_check_at IS NULL OR t.next_check_at <= %s)
         """
         with conn.cursor() as cur:
-            cur.execute(sql)
-            tickets = cur.fetchall()
+            cur.execute(sql, (now, now + LOOKAHEAD,
+                              now - MAX_UTC_OFFSET, now + LOOKAHEAD + MAX_UTC_OFFSET, now))
+            tickets = [Ticket(r['id'], r['ticket_number'], r['user_id'], r['departure_datetime'],
+                              r['departure_utc'], r['email'], r['username'])
+                       for r in cur]
 
-        # 2) Load all prior flight alerts
-        with conn.cursor() as cur:
-            cur.execute("SELECT ticket_number, user_id, last_status, depart_time FROM flight_alerts")
-            prior = { (r['user_id'], r['ticket_number']) : r for r in cur }
+        # 2) Load prior alerts for these tickets
+        prior = load_prior_alerts(conn, tickets)
+
+        # 3) Fetch each distinct flight once, soonest departures first
+        tickets.sort(key=lambda t: t.departure_utc or t.departure_datetime)
+        statuses = flight_status.fetch_flights(
+            flight_status.flight_key(t.ticket_number, t.departure_datetime) for t in tickets
+        )
+
+        # Alerts coalesced per recipient: user_id -> notification payload
+        digests = {}
+        # Ticket id -> next poll time, for tickets checked this run
+        next_checks = {}
+        # Ticket id -> UTC departure learned from the airport's timezone this run
+        departure_utcs = {}
+        # flight_alerts rows to upsert for this run's alerts
+        alert_rows = []
 
-        # 3) Process each ticket
+        # 4) Process each ticket
         for tkt in tickets:
-            iata         = tkt['ticket_number']
-            user_id      = tkt['user_id']
-            scheduled_dt = tkt['departure_datetime']
+            iata         = tkt.ticket_number
+            user_id      = tkt.user_id
+            scheduled_dt = tkt.departure_datetime
+            email        = tkt.email
+            name         = tkt.name
 
-            # fetch user email & name
-            with conn.cursor() as cur:
-                cur.execute("SELECT email, username FROM users WHERE id=%s", (user_id,))
-                u = cur.fetchone() or {}
-            email = u.get('email')
-            name  = u.get('username')
-
-            # 4) Call flight API for current status
-            resp = requests.get(
-                'http://api.aviationstack.com/v1/flights',
-                params={'access_key': FLIGHT_API_KEY, 'flight_iata': iata, 'limit': 1}
-            )
-            data = resp.json().get('data', [])
-            if not data:
+            # Current status of this ticket's flight, shared by every holder
+            current = statuses.get(flight_status.flight_key(iata, scheduled_dt))
+            if not current:
+                # Failed, skipped and unknown flights back off rather than staying due every run
+                next_checks[tkt.id] = now + CLOSE_INTERVAL
                 continue
-            f       = data[0]
-            status  = f.get('flight_status','').lower()
-            dep     = f.get('departure', {})
-            est     = dep.get('estimated') or dep.get('scheduled')
-            curr_dt = None
-            if est:
-                curr_dt = datetime.fromisoformat(est.replace('Z','+00:00')).replace(tzinfo=None)
+            status, curr_dt, dep_tz = current
+
+            # Poll against the latest known departure, in UTC
+            departure_utc = tkt.departure_utc or flight_status.to_utc(scheduled_dt, dep_tz)
+            if departure_utc:
+                if not tkt.departure_utc:
+                    departure_utcs[tkt.id] = departure_utc
+                departure = max(departure_utc, flight_status.to_utc(curr_dt, dep_tz) or departure_utc)
+                next_checks[tkt.id] = next_check_time(departure, now)
+            else:
+                next_checks[tkt.id] = now + CLOSE_INTERVAL
 
             # 5) Compare against prior using composite key
             key        = (user_id, iata)
@@ -86,33 +205,40 @@ def handler(event, context):
                         send = True
 
             if send:
-                # 6) Upsert into flight_alerts with composite key
-                with conn.cursor() as cur2:
-                    cur2.execute("""
-                        INSERT INTO flight_alerts
-                          (ticket_number, user_id, last_status, depart_time, alerted_at)
-                        VALUES (%s, %s, %s, %s, NOW())
-                        ON DUPLICATE KEY UPDATE
-                          last_status = VALUES(last_status),
-                          depart_time = VALUES(depart_time),
-                          alerted_at  = NOW()
-                    """, (iata, user_id, status, curr_dt))
-                conn.commit()
-
-                # 7) Enqueue notification payload
-                msg = {
-                    'email':   email,
-                    'name':    name,
-                    'flights': [{
-                        'ticket':      iata,
-                        'status':      status,
-                        'depart_time': curr_dt.isoformat() if curr_dt else None
-                    }]
-                }
-                sqs.send_message(QueueUrl=QUEUE_URL, MessageBody=json.dumps(msg))
-                logger.info("Enqueued flight alert for %s (user %s)", iata, user_id)
+                # 6) Remember the new alert state and add the flight to the user's digest
+                alert_rows.append((iata, user_id, status, curr_dt, now))
+                digest = digests.setdefault(user_id, {'email': email, 'name': name, 'flights': []})
+                digest['flights'].append({
+                    'ticket':      iata,
+                    'status':      status,
+                    'depart_time': curr_dt.isoformat() if curr_dt else None
+                })
+
+        # 7) Record alert state, next check times and newly learned UTC
+        #    departures in one transaction
+        with db.transaction(conn):
+            record_alerts(conn, alert_rows)
+            schedule_next_checks(conn, next_checks)
+            record_departure_utc(conn, departure_utcs)
+
+        # 8) Only once the state is committed, enqueue one notification per user
+        #    covering all of their changed flights
+        with sqs_producer.BufferedProducer(QUEUE_URL, sqs) as producer:
+            for user_id, digest in digests.items():
+                producer.send(digest, key=user_id)
+        logger.info("Enqueued flight alerts for %d user(s), %d failed", len(producer.sent), len(producer.failed))
+
+        # 9) Undo the recorded state for users whose alert could not be enqueued and
+        #    make their tickets due again, then fail the run so it is retried
+        if producer.failed:
+            failed_users = set(producer.failed)
+            with db.transaction(conn):
+                revert_alerts(conn, prior, [r for r in alert_rows if r[1] in failed_users])
+                schedule_next_checks(conn, {t.id: now for t in tickets
+                                            if t.user_id in failed_users and t.id in next_checks})
+            raise Exception(f"Failed to enqueue flight alerts for {len(failed_users)} user(s)")
 
     finally:
-        conn.close()
+        db.release(conn)
 
     return {'statusCode': 200}
@@ -1,10 +1,16 @@
 import os
 import json
 import boto3
-import pymysql
+import db
+import forecast
+import forecast_cache
 import requests
+import sqs_producer
+import weather_advice
 import logging
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 
 # —————————————
 # Configuration & clients
@@ -13,180 +19,250 @@ logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
 
 sqs             = boto3.client('sqs')
+lambda_client   = boto3.client('lambda')
 QUEUE_URL       = os.environ['QUEUE_URL']  # SQS queue for weather report messages
-DB_HOST         = os.environ['DB_HOST']
-DB_USER         = os.environ['DB_USER']
-DB_PASSWORD     = os.environ['DB_PASSWORD']
-DB_NAME         = os.environ['DB_NAME']
 WEATHER_API_KEY = os.environ['WEATHER_API_KEY']  # OpenWeatherMap API key
+FORECAST_URL    = 'https://api.openweathermap.org/data/2.5/forecast'
 
-# —————————————
-# Recommendation matrix
-# —————————————
-RECOMMENDATIONS = {
-    # Clear
-    "Clear|cold|any|calm":    "Insulated coat, scarf & hat. ❄️ Outdoor hike or golden‑hour photos.",
-    "Clear|cold|any|breezy":  "Insulated coat, scarf & hat. Brisk walk—stay layered.",
-    "Clear|cool|any|calm":    "Light jacket & long sleeves. 🚶 City tour or café patio.",
-    "Clear|cool|any|breezy":  "Light jacket & windbreaker. 🚶 Urban stroll.",
-    "Clear|mild|any|calm":    "T‑shirt + light pants. 🚴 Biking or picnic.",
-    "Clear|mild|any|breezy":  "T‑shirt + light pants. ☀️ Al fresco brunch.",
-    "Clear|warm|any|calm":    "Shorts & breathable top + sunglasses. 🏖️ Beach or pool.",
-    "Clear|warm|any|breezy":  "Shorts & breathable top. 🏖️ Beach stroll.",
-    "Clear|hot|low|calm":     "Tank top & shorts, sunhat, sunscreen. 🏊‍♀️ Swim or mall (AC breaks).",
-    "Clear|hot|high|calm":    "Moisture‑wicking fabrics & sunhat. 🌳 Shaded park or museum.",
-    # Clouds
-    "Clouds|cold|any|calm":   "Warm coat & layers. ☕ Café or indoor museum.",
-    "Clouds|cold|any|breezy": "Warm layers + wind‑proof jacket. 🏛️ Indoor museum, cozy café.",
-    "Clouds|cool|any|calm":   "Light jacket & long sleeves. 🚶 City stroll.",
-    "Clouds|cool|any|breezy": "Light layers & windbreaker. 🚶 Gallery visits.",
-    "Clouds|mild|any|calm":   "Long‑sleeve top & trousers. ☕ Rooftop café or light hike.",
-    "Clouds|mild|any|breezy": "Light sweater & trousers. ☕ Patio or park walk.",
-    "Clouds|warm|any|calm":   "Long‑sleeve top & light pants. ☀️ Al fresco brunch.",
-    "Clouds|warm|any|breezy": "Long‑sleeve + windbreaker. 🚴 Scenic bike ride.",
-    "Clouds|hot|any|calm":     "Light layers & breathable fabrics. 🌤️ Gentle hike or city stroll.",
-    "Clouds|hot|any|breezy":   "Windbreaker & light pants. 🌤️ Breezy outdoor walking or outdoor café.",
-    # Rain & co.
-    "Rain|any|any|any":           "Waterproof jacket, boots & umbrella. 🏞️ Waterfall tour or aquarium.",
-    "Drizzle|any|any|any":        "Light raincoat & water‑resistant shoes. 🛋️ Bookstore or indoor market.",
-    "Thunderstorm|any|any|any":   "Stay dry—avoid outdoor plans. 🎥 Cinema or spa.",
-    # Snow
-    "Snow|any|any|any":           "Heavy coat, insulated boots, gloves & hat. ⛷️ Ski or snow‑shoe walk.",
-    # Atmosphere
-    "Mist|any|any|calm":          "Layers & high‑visibility jacket. 🚗 Drive carefully or brief stroll.",
-    "Mist|any|any|breezy":        "Layers & wind‑proof coat. 🚗 Short indoor visits.",
-    "Fog|any|any|any":            "Warm layers & reflective gear. 🚗 Stay cautious on drives.",
-    "Haze|any|any|any":           "Light mask & long sleeves. 🌬️ Indoor air‑conditioned spots.",
-    "Smoke|any|any|any":          "Protective mask & long sleeves. 🌬️ Indoor AC, light activity.",
-    "Dust|any|any|any":           "Goggles & scarf over mouth. 🏜️ Quick outdoor stop, indoor visits.",
-    "Sand|any|any|any":           "Goggles & scarf. 🏜️ Short outdoor stop, indoor refuge.",
-    "Ash|any|any|any":            "Mask & long clothing. 🛖 Stay indoors if possible.",
-    # Extreme
-    "Squall|any|any|high":        "Emergency gear—stay indoors. 🛑 Shelter in place.",
-    "Tornado|any|any|any":        "Seek immediate shelter. 🚨 Follow local warnings.",
-    # fallback
-    "default":                    "Dress comfortably and check a local weather app for last‑minute updates!"
-}
+# Forecast fetching: distinct cities are fetched in parallel, each with a timeout and retries
+WEATHER_MAX_CONCURRENCY = int(os.environ.get('WEATHER_MAX_CONCURRENCY', 8))
+WEATHER_TIMEOUT_SECONDS = float(os.environ.get('WEATHER_TIMEOUT_SECONDS', 5))
+WEATHER_MAX_RETRIES     = int(os.environ.get('WEATHER_MAX_RETRIES', 2))
 
+# Paging & fan-out: trips are read in keyset pages and progress is checkpointed
+# per page, so a timed-out or failed run resumes where it stopped
+WEATHER_PAGE_SIZE       = int(os.environ.get('WEATHER_PAGE_SIZE', 200))
+WEATHER_SHARDS          = int(os.environ.get('WEATHER_SHARDS', 1))
+WEATHER_SAFETY_MS       = int(os.environ.get('WEATHER_SAFETY_MS', 60000))
+CHECKPOINT_JOB          = 'weather_report'
 
-def handler(event, context):
-    logger.debug("=== Weather Writer start ===")
-    conn = pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
 
-    try:
-        # Load tomorrow’s trips (include duration & destination)
-        sql = """
-            SELECT
-              t.id           AS trip_id,
-              u.email,
-              u.username     AS name,
-              t.start_city,
-              t.end_city     AS destination,
-              t.start_date,
-              t.duration
-            FROM trips t
-            JOIN users u ON u.id = t.user_id
-            WHERE DATE(t.start_date) = DATE_ADD(CURDATE(), INTERVAL 1 DAY)
-        """
-        with conn.cursor() as cur:
-            cur.execute(sql)
-            trips = cur.fetchall()
-        logger.info("Found %d trips for weather report", len(trips))
-
-        # For each trip, fetch forecast and calculate daily stats
+def normalize_city(destination):
+    """Grouping key for a trip destination: the city part, case- and space-insensitive."""
+    return ' '.join(destination.split(',')[0].split()).lower()
+
+
+def fetch_forecast(city):
+    """Fetch the 5-day / 3-hour forecast list for a city, retrying transient failures."""
+    for attempt in range(WEATHER_MAX_RETRIES + 1):
+        try:
+            resp = requests.get(
+                FORECAST_URL,
+                params={'q': city, 'appid': WEATHER_API_KEY},
+                timeout=WEATHER_TIMEOUT_SECONDS
+            )
+            # Unknown cities won't succeed on retry
+            if resp.status_code == 404:
+                logger.error("Forecast not found for %s", city)
+                return None
+            resp.raise_for_status()
+            return resp.json().get('list', [])
+        except Exception as e:
+            logger.warning("Forecast fetch for %s failed (attempt %d): %s", city, attempt + 1, e)
+            if attempt < WEATHER_MAX_RETRIES:
+                time.sleep(0.5 * 2 ** attempt)
+    logger.error("Forecast fetch failed for %s", city)
+    return None
+
+
+def cached_forecast(city):
+    """Forecast for a city from the shared cache, fetching it once per 3-hour window."""
+    return forecast_cache.get_or_fetch(city, fetch_forecast)
+
+
+def fetch_forecasts(cities):
+    """Fetch each distinct city once, concurrently; returns {city: forecast_list or None}."""
+    cities = list(cities)
+    if not cities:
+        return {}
+    workers = min(WEATHER_MAX_CONCURRENCY, len(cities))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(cities, pool.map(cached_forecast, cities)))
+
+
+def build_daily_reports(forecast_list):
+    """{date: report entry} for every day in a city's forecast."""
+    return {
+        day: {'date': day, **stats, 'recommendation': weather_advice.recommend(stats)}
+        for day, stats in forecast.bucket_forecast(forecast_list).items()
+    }
+
+
+def load_checkpoint(conn, run_key):
+    """(last processed trip id, completed) for a run; a new run starts at ('', False)."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT last_id, completed FROM job_checkpoints WHERE job = %s AND run_key = %s",
+            (CHECKPOINT_JOB, run_key)
+        )
+        row = cur.fetchone()
+    if not row:
+        return '', False
+    return row['last_id'] or '', bool(row['completed'])
+
+
+def save_checkpoint(conn, run_key, last_id, completed=False):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO job_checkpoints (job, run_key, last_id, completed)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+              last_id   = VALUES(last_id),
+              completed = VALUES(completed)
+        """, (CHECKPOINT_JOB, run_key, last_id, completed))
+
+
+def query_trips_page(conn, run_date, after_id, shard, shards):
+    """Next page of trips starting on run_date in this shard, ordered by trip id.
+
+    run_date is a date; the range on start_date (not DATE(start_date)) lets
+    the (start_date, id) index serve both the filter and the keyset.
+    """
+    sql = """
+        SELECT
+          t.id           AS trip_id,
+          u.email,
+          u.username     AS name,
+          t.start_city,
+          t.end_city     AS destination,
+          t.start_date,
+          t.duration
+        FROM trips t
+        JOIN users u ON u.id = t.user_id
+        WHERE t.start_date >= %s
+          AND t.start_date < %s
+          AND t.id > %s
+          AND CRC32(t.id) %% %s = %s
+        ORDER BY t.id
+        LIMIT %s
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (run_date, run_date + timedelta(days=1), after_id, shards, shard, WEATHER_PAGE_SIZE))
+        return cur.fetchall()
+
+
+def enqueue_reports(trips):
+    """Build and enqueue the weather report for each trip.
+
+    Returns (number enqueued, ids of trips whose report SQS did not accept).
+    """
+    # Fetch each destination city once, then fan the forecasts back out to trips
+    forecasts = fetch_forecasts({normalize_city(t['destination']) for t in trips})
+    logger.info("Fetched forecasts for %d distinct cities", len(forecasts))
+
+    # Bucket each city's forecast by day once; every trip to that city reuses it
+    daily_reports = {
+        city: build_daily_reports(forecast_list)
+        for city, forecast_list in forecasts.items()
+        if forecast_list is not None
+    }
+
+    # For each trip, pick its days from the city's daily reports; reports
+    # are sent in batches of 10 and the last batch is flushed on exit
+    with sqs_producer.BufferedProducer(QUEUE_URL, sqs) as producer:
         for trip in trips:
             email       = trip['email']
             name        = trip['name']
             start_city  = trip['start_city']
             destination = trip['destination']
-            city_short  = destination.split(',')[0]
             start_date  = trip['start_date']
             duration    = trip['duration'] or 1
 
-            resp = requests.get(
-                'https://api.openweathermap.org/data/2.5/forecast',
-                params={'q': city_short, 'appid': WEATHER_API_KEY}
-            )
-            try:
-                resp.raise_for_status()
-                forecast_list = resp.json().get('list', [])
-            except Exception:
-                logger.error("Forecast fetch failed for %s", city_short)
+            daily = daily_reports.get(normalize_city(destination))
+            if daily is None:
                 continue
 
             entries = []
             for i in range(duration):
                 day = (start_date + timedelta(days=i)).isoformat()
-                temps, winds, hums, pops = [], [], [], []
-                condition = None
-                for e in forecast_list:
-                    dt = e.get('dt_txt')
-                    if dt and dt.startswith(day):
-                        main = e['main']
-                        temps.append(main['temp'] - 273.15)
-                        winds.append(e['wind']['speed'])
-                        hums.append(main['humidity'])
-                        pops.append(e.get('pop', 0.0))
-                        if condition is None:
-                            condition = e['weather'][0]['main']
-                if not temps:
-                    continue
-
-                tmin = round(min(temps))
-                tmax = round(max(temps))
-                wavg = round(sum(winds)/len(winds), 1)
-                havg = round(sum(hums)/len(hums))
-                precip = round(max(pops)*100)
-
-                # Banding
-                if tmax <= 10: tb='cold'
-                elif tmax <= 20: tb='cool'
-                elif tmax <= 25: tb='mild'
-                elif tmax <= 30: tb='warm'
-                else: tb='hot'
-                hb = 'high' if havg >= 60 else 'low'
-                wb = 'calm' if wavg <= 5 else 'breezy' if wavg <= 10 else 'high'
-
-                # Wildcard lookup
-                key_parts = (condition, tb, hb, wb)
-                rec = next((v for k,v in RECOMMENDATIONS.items()
-                            if k!='default' and all(kp==cp or kp=='any'
-                                for kp,cp in zip(k.split('|'), key_parts))),
-                           RECOMMENDATIONS['default'])
-
-                entries.append({
-                    'date': day,
-                    'condition': condition,
-                    'temp_min': tmin,
-                    'temp_max': tmax,
-                    'precipitation': precip,
-                    'humidity': havg,
-                    'wind': wavg,
-                    'recommendation': rec
-                })
+                if day in daily:
+                    entries.append(daily[day])
 
             if entries:
-                sqs.send_message(
-                    QueueUrl=QUEUE_URL,
-                    MessageBody=json.dumps({
-                        'email': email,
-                        'name': name,
-                        'start_city': start_city,
-                        'destination': destination,
-                        'weather': entries
-                    })
-                )
-                logger.info("Enqueued weather report for %s→%s", start_city, destination)
+                producer.send({
+                    'email': email,
+                    'name': name,
+                    'start_city': start_city,
+                    'destination': destination,
+                    'weather': entries
+                }, key=trip['trip_id'])
+    return len(producer.sent), producer.failed
+
+
+def invoke_self(context, payload):
+    """Start another invocation of this function asynchronously."""
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(payload).encode('utf-8')
+    )
+
+
+def handler(event, context):
+    """Send weather reports for trips starting on event['run_date'] (default: tomorrow).
+
+    A scheduled run with WEATHER_SHARDS > 1 fans out one async invocation per
+    shard. Each shard pages through its trips by id and checkpoints after
+    every page. When time runs short it hands the rest to a fresh invocation,
+    and reruns of a finished shard do nothing. If SQS rejects a report the
+    checkpoint stops before that trip and the invocation fails, so a retry
+    resends from there; a crash between enqueueing a page and checkpointing
+    it resends at most that page.
+    """
+    logger.debug("=== Weather Writer start ===")
+    event    = event if isinstance(event, dict) else {}
+    run_date = (date.fromisoformat(event['run_date']) if event.get('run_date')
+                else date.today() + timedelta(days=1))
+    shards   = int(event.get('shards', WEATHER_SHARDS))
+
+    if 'shard' not in event and shards > 1:
+        for shard in range(shards):
+            invoke_self(context, {'run_date': run_date.isoformat(), 'shard': shard, 'shards': shards})
+        logger.info("Fanned out weather reports for %s to %d shard(s)", run_date, shards)
+        return {'statusCode': 202}
+
+    shard   = int(event.get('shard', 0))
+    run_key = f"{run_date.isoformat()}:{shard}/{shards}"
+    conn    = db.get_dict_connection()
+    sent    = 0
+
+    try:
+        after_id, completed = load_checkpoint(conn, run_key)
+        if completed:
+            logger.info("Weather reports for %s already sent", run_key)
+            return {'statusCode': 200}
+
+        # Every invocation processes at least one page before it may hand off,
+        # so a safety margin close to the function timeout can't loop forever
+        while True:
+            trips = query_trips_page(conn, run_date, after_id, shard, shards)
+            if not trips:
+                save_checkpoint(conn, run_key, after_id, completed=True)
+                break
+
+            page_sent, failed = enqueue_reports(trips)
+            sent += page_sent
+            if failed:
+                # Resume from the first trip whose report wasn't accepted; the
+                # error fails this invocation so it is retried
+                failed = set(failed)
+                first = next(i for i, t in enumerate(trips) if t['trip_id'] in failed)
+                if first:
+                    save_checkpoint(conn, run_key, trips[first - 1]['trip_id'])
+                raise Exception(f"Failed to enqueue weather reports for {len(failed)} trip(s) in {run_key}")
+
+            after_id = trips[-1]['trip_id']
+            save_checkpoint(conn, run_key, after_id)
+            logger.info("Processed %d trips for %s up to %s", len(trips), run_key, after_id)
+
+            if context and context.get_remaining_time_in_millis() < WEATHER_SAFETY_MS:
+                invoke_self(context, {'run_date': run_date.isoformat(), 'shard': shard, 'shards': shards})
+                logger.warning("Handing %s off to a new invocation after trip %s", run_key, after_id)
+                return {'statusCode': 202}
 
     finally:
-        conn.close()
-        logger.debug("DB connection closed")
+        db.release(conn)
+        logger.debug("DB connection released")
 
+    logger.info("Enqueued %d weather report(s) for %s", sent, run_key)
     return {'statusCode': 200}
-    
\ No newline at end of file